@@ -0,0 +1,185 @@
+"""
+Reproducible timings and peak memory for the collatzCalc pipeline.
+
+    python benchmarks.py --sizes 1000 10000 100000 --out bench.json
+    python benchmarks.py --compare old.json new.json
+    python benchmarks.py --check-startup
+
+Runs headless (no InquirerPy prompt) inside a temporary directory, so the
+exporters' files never land in the repository.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import collatzCalc as c
+
+SEED = 1234
+SIDE_INFOS = {"Mod6": lambda n, g: n%6}
+COLOR = lambda n, g: 'green' if n%2 else ''
+HEAVY_MODULES = ["pandas", "sympy", "InquirerPy", "pyarrow"] # Never loaded by a plain Mermaid export
+STARTUP_BUDGET = 0.5 # Seconds to import collatzCalc
+STARTUP_PROBE = """
+import io, json, sys, time
+start = time.perf_counter()
+import collatzCalc as c
+startup = time.perf_counter() - start
+c.write_mermaid_code(c.generate_collatz(range(1, 100), {"Mod6": lambda n, g: n%6}), io.StringIO(), {"Mod6": lambda n, g: n%6})
+print(json.dumps({"startup_seconds": startup, "loaded": [m for m in sys.argv[1:] if m in sys.modules]}))
+"""
+MAX_SIZE = { # Largest size that is still feasible for each benchmark
+    "generate_collatz[range]": 10**6,
+    "generate_collatz[list]": 10**6,
+    "generate_mermaid_code": 10**5,
+    "export_nodes_to_csv": 10**6,
+    "generate_mermaid_link": 10**5,
+}
+
+
+def scattered(size):
+    rnd = random.Random(SEED)
+    return rnd.sample(range(1, 100*size), size)
+
+
+def cases(size):
+    """(name, setup, run) for every benchmark; setup's result is passed to run and not timed"""
+    graph = lambda: c.generate_collatz(range(1, size+1), SIDE_INFOS, COLOR)
+
+    def mermaid_code():
+        f = io.StringIO()
+        c.write_mermaid_code(graph(), f, SIDE_INFOS, COLOR)
+        return f.getvalue()
+
+    def write_mermaid(g):
+        # The streaming writer only, the link is benchmarked on its own
+        with open(f'bench-{size}.mmd', "w", buffering=1 << 16) as f:
+            c.write_mermaid_code(g, f, SIDE_INFOS, COLOR)
+
+    return [
+        ("generate_collatz[range]", lambda: range(1, size+1), lambda itr: c.generate_collatz(itr, SIDE_INFOS, COLOR)),
+        ("generate_collatz[list]", lambda: scattered(size), lambda itr: c.generate_collatz(itr, SIDE_INFOS, COLOR)),
+        ("generate_mermaid_code", graph, write_mermaid),
+        ("export_nodes_to_csv", graph, lambda g: c.export_nodes_to_csv(g, f'bench-{size}', SIDE_INFOS, COLOR)),
+        ("generate_mermaid_link", mermaid_code, lambda code: c.generate_mermaid_link(code)),
+    ]
+
+
+def measure(setup, run, repeat):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), warnings.catch_warnings():
+        warnings.simplefilter("ignore") # Link budget warnings
+        return _measure(setup, run, repeat)
+
+
+def _measure(setup, run, repeat):
+    seconds = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        seconds.append(time.perf_counter() - start)
+
+    # Memory in a separate run, tracemalloc slows the code down
+    arg = setup()
+    tracemalloc.start()
+    run(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"seconds": min(seconds), "mean_seconds": sum(seconds)/len(seconds), "peak_bytes": peak}
+
+
+def check_startup(budget=STARTUP_BUDGET):
+    """
+    Imports collatzCalc and runs a small Mermaid export in a fresh interpreter;
+    fails if that is slower than budget or loads any of HEAVY_MODULES.
+    """
+    probe = subprocess.run([sys.executable, "-c", STARTUP_PROBE, *HEAVY_MODULES], capture_output=True, text=True,
+                           check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    result = json.loads(probe.stdout.strip().splitlines()[-1])
+    print(f'import collatzCalc {result["startup_seconds"]:.3f}s, heavy modules loaded: {result["loaded"] or "none"}')
+    return result["startup_seconds"] <= budget and not result["loaded"]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(sizes, repeat, only=None):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for size in sizes:
+                for name, setup, run in cases(size):
+                    if (only and name not in only) or size > MAX_SIZE[name]:
+                        continue
+                    result = {"name": name, "size": size, **measure(setup, run, repeat)}
+                    print(f'{name:28} {size:>9} {result["seconds"]:10.4f}s {result["peak_bytes"]/2**20:10.1f}MiB', file=sys.stderr)
+                    results.append(result)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+        print(f'{key[0]:28} {key[1]:>9} time x{n["seconds"]/o["seconds"]:6.2f}  memory x{n["peak_bytes"]/max(o["peak_bytes"], 1):6.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**3, 10**4, 10**5])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", help="benchmark names to run")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--check-startup", action="store_true", help="exit with 1 if startup regressed")
+    args = parser.parse_args()
+
+    if args.check_startup:
+        sys.exit(0 if check_startup() else 1)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run_suite(args.sizes, args.repeat, args.only)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+SUPERSCRIPTS = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+
+def chain_label(steps):
+    # The operations from steps[0] to the node after steps[-1], e.g. "×3+1 ÷2⁴"
+    ops = []
+    halvings = 0
+    for n in steps:
+        if n %2==0:
+            halvings += 1
+            continue
+        if halvings:
+            ops.append("÷2" + (str(halvings).translate(SUPERSCRIPTS) if halvings > 1 else ""))
+            halvings = 0
+        ops.append("×3+1")
+    if halvings:
+        ops.append("÷2" + (str(halvings).translate(SUPERSCRIPTS) if halvings > 1 else ""))
+    return " ".join(ops)
+
+
+class _ChainNodeView:
+
+    def __init__(self, view):
+        self._view = view
+
+    def __call__(self):
+        return list(self._view)
+
+    def __iter__(self):
+        return iter(self._view)
+
+    def __len__(self):
+        return len(self._view)
+
+    def __contains__(self, n):
+        return n in self._view
+
+    def __getitem__(self, n):
+        if n not in self._view:
+            raise KeyError(n)
+        return self._view.graph.nodes[n]
+
+    def get(self, n, default=None):
+        return self[n] if n in self._view else default
+
+    def items(self):
+        nodes = self._view.graph.nodes
+        return ((n, nodes[n]) for n in self._view)
+
+
+class ChainView:
+    """
+    g with its straight line chains collapsed: nodes with one predecessor and one
+    successor become part of an edge labelled with their steps, e.g. 16->8->4->2->1
+    is the edge 16 -"÷2⁴"-> 1. Branch points, 1 and the keep values (the user's
+    start values) stay nodes. Reads like a graph for the exporters, nothing is copied;
+    edgeLabel(u, v) gives the label, "" for an edge of a single step.
+    """
+
+    def __init__(self, g, keep=()):
+        self.graph = g
+        keep = set(keep)
+
+        indegree = {}
+        for n in g:
+            for successor in g.successors(n):
+                indegree[successor] = indegree.get(successor, 0) + 1
+
+        self._kept = [n for n in g if n == 1 or n in keep or indegree.get(n, 0) != 1]
+        kept = set(self._kept)
+
+        # Every collapsed node is on exactly one chain, so this is one pass over g
+        self._successor = {}
+        self._labels = {}
+        for n in self._kept:
+            if n == 1:
+                continue
+            steps = [n]
+            successor = next(iter(g.successors(n)))
+            while successor not in kept:
+                steps.append(successor)
+                successor = next(iter(g.successors(successor)))
+            self._successor[n] = successor
+            self._labels[n] = chain_label(steps) if len(steps) > 1 else ""
+        self._predecessors = None
+
+    @property
+    def nodes(self):
+        return _ChainNodeView(self)
+
+    def __iter__(self):
+        return iter(self._kept)
+
+    def __len__(self):
+        return len(self._kept)
+
+    def __contains__(self, n):
+        return n in self._successor or n == 1
+
+    def number_of_nodes(self):
+        return len(self._kept)
+
+    def successors(self, n):
+        return [self._successor[n]] if n in self._successor else []
+
+    neighbors = successors
+
+    def predecessors(self, n):
+        if self._predecessors is None:
+            self._predecessors = {}
+            for m, successor in self._successor.items():
+                self._predecessors.setdefault(successor, []).append(m)
+        return iter(self._predecessors.get(n, ()))
+
+    def edgeLabel(self, u, v):
+        return self._labels[u] if self._successor.get(u) == v else ""
@@ -0,0 +1,164 @@
+import numpy as np
+from sideInfos import UINT64_MAX, side_columns
+
+UINT64_SAFE = (UINT64_MAX - 1)//3 # Largest n for which 3n+1 still fits in uint64
+
+
+class TrajectoryBatch:
+    """
+    Per start value statistics of a range, computed without building a graph.
+
+    StoppingTime: steps to reach 1 (same as the graph attribute)
+    GlideTime: steps until the trajectory first falls below its start
+    Peak: highest value on the trajectory
+    OddSteps: number of 3n+1 steps
+    """
+
+    COLUMNS = ["StoppingTime", "GlideTime", "Peak", "OddSteps"]
+
+    def __init__(self, values, columns):
+        self.values = values
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return (int(n) for n in self.values)
+
+    def position(self, n):
+        i = int(np.searchsorted(self.values, n))
+        if i == len(self.values) or self.values[i] != n:
+            raise KeyError(n)
+        return i
+
+    @property
+    def nodes(self):
+        return _BatchNodeView(self)
+
+    def nodeColumns(self, values):
+        positions = np.searchsorted(self.values, values if self.values.dtype == object else values.astype(np.uint64))
+        return {title: self.columns[title][positions] for title in self.COLUMNS}
+
+    def to_dataframe(self, sideInfos=None, determineColor=None):
+        import pandas as pd
+
+        df = pd.DataFrame(self.columns, index=self.values, columns=self.COLUMNS)
+        for title, column in side_columns(self, self.values, sideInfos, determineColor):
+            df[title] = column
+        return df
+
+
+class _BatchNodeView:
+
+    def __init__(self, batch):
+        self._batch = batch
+
+    def __getitem__(self, n):
+        i = self._batch.position(n)
+        return {title: int(self._batch.columns[title][i]) for title in TrajectoryBatch.COLUMNS}
+
+    def get(self, n, default=None):
+        try:
+            return self[n]
+        except KeyError:
+            return default
+
+
+def _finish_big(n, start, lo, step, steps, odd, peak, glide):
+    # Lanes whose values no longer fit in uint64 continue with python ints
+    while True:
+        if n %2==1:
+            n = 3*n+1
+            odd += 1
+        else:
+            n = n//2
+        steps += 1
+        peak = max(peak, n)
+
+        if n < start and glide < 0:
+            glide = steps
+        if n == 1:
+            return steps, odd, peak, glide, -1
+        if lo <= n < start and (n-lo) %step==0:
+            return steps, odd, peak, glide, (n-lo)//step
+
+
+def batch_trajectories(itr):
+    lo, stop, step = itr.start, itr.stop, itr.step
+    if lo < 1 or step < 1:
+        raise ValueError("batch mode needs an increasing range of positive numbers")
+
+    values = np.arange(lo, stop, step, dtype=np.uint64)
+    count = len(values)
+
+    # Segment results: from each start until it reaches 1 or lands on a smaller start of the range
+    seg_steps = np.zeros(count, dtype=np.int64)
+    seg_odd = np.zeros(count, dtype=np.int64)
+    seg_peak = values.copy()
+    glide = np.full(count, -1, dtype=np.int64)
+    land = np.full(count, -1, dtype=np.int64)
+    big = {}
+
+    glide[values == 1] = 0
+    idx = np.flatnonzero(values != 1)
+    cur, start = values[idx], values[idx]
+    steps = np.zeros(len(idx), dtype=np.int64)
+    odd = np.zeros(len(idx), dtype=np.int64)
+    peak = cur.copy()
+    lane_glide = np.full(len(idx), -1, dtype=np.int64)
+
+    while len(idx):
+        is_odd = (cur & 1).astype(bool)
+
+        overflow = is_odd & (cur > UINT64_SAFE)
+        if overflow.any():
+            for i in np.flatnonzero(overflow):
+                big[int(idx[i])] = _finish_big(int(cur[i]), int(start[i]), lo, step,
+                                          int(steps[i]), int(odd[i]), int(peak[i]), int(lane_glide[i]))
+            keep = ~overflow
+            idx, cur, start, steps, odd, peak, lane_glide, is_odd = (
+                a[keep] for a in (idx, cur, start, steps, odd, peak, lane_glide, is_odd))
+
+        cur = np.where(is_odd, 3*cur+1, cur >> 1)
+        steps += 1
+        odd += is_odd
+        np.maximum(peak, cur, out=peak)
+
+        below = cur < start
+        lane_glide[below & (lane_glide < 0)] = steps[below & (lane_glide < 0)]
+
+        in_range = below & (cur >= lo) & ((cur - lo) %step==0)
+        done = (cur == 1) | in_range
+        if done.any():
+            d = idx[done]
+            seg_steps[d], seg_odd[d], seg_peak[d], glide[d] = steps[done], odd[done], peak[done], lane_glide[done]
+            land[d] = np.where(in_range[done], ((cur[done] - lo)//step).astype(np.int64), -1)
+
+            keep = ~done
+            idx, cur, start, steps, odd, peak, lane_glide = (
+                a[keep] for a in (idx, cur, start, steps, odd, peak, lane_glide))
+
+    if big:
+        seg_peak = seg_peak.astype(object)
+        for i, (s, o, p, g, l) in big.items():
+            seg_steps[i], seg_odd[i], seg_peak[i], glide[i], land[i] = s, o, p, g, l
+
+    # Follow the landing chains, each start adds the segments of the smaller starts it lands on
+    total_steps, total_odd, total_peak = seg_steps.copy(), seg_odd.copy(), seg_peak.copy()
+    ptr = land.copy()
+    pending = np.flatnonzero(ptr >= 0)
+    while len(pending):
+        p = ptr[pending]
+        total_steps[pending] += seg_steps[p]
+        total_odd[pending] += seg_odd[p]
+        total_peak[pending] = np.maximum(total_peak[pending], seg_peak[p])
+        ptr[pending] = land[p]
+        pending = pending[ptr[pending] >= 0]
+
+    return TrajectoryBatch(values, {
+        "StoppingTime": total_steps,
+        "GlideTime": glide,
+        "Peak": total_peak,
+        "OddSteps": total_odd,
+    })
@@ -0,0 +1,151 @@
+import marshal
+import sqlite3
+
+DEFAULT_CACHE_PATH = './collatz_cache.sqlite'
+SQLITE_INT_MAX = (1 << 63) - 1
+QUERY_CHUNK = 30000 # Stays under SQLite's limit of host parameters per statement (32766 since 3.32)
+
+
+def _key(n):
+    # SQLite integers are 64 bit, bigger values are kept as text
+    return n if n <= SQLITE_INT_MAX else str(n)
+
+
+def _int(v):
+    return v if v is None or type(v) is int else int(v)
+
+
+class TrajectoryCache:
+    """
+    Persistent trajectories, one row per walk a run made: the start, its stopping
+    time, the values walked (start first, marshalled) until the trajectory joined
+    an earlier walk, and that walk's start as `via` (NULL when it ran into 1).
+    A start that lies on an earlier walk has no values, only that walk as via.
+    A start's whole trajectory comes back in one query per level of joins, and
+    goes into a graph or store in bulk instead of being stepped through.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        # n and via have no type affinity so 64 bit integers and big values in text form can share them
+        self.db.execute("CREATE TABLE IF NOT EXISTS walk (n PRIMARY KEY, stopping INTEGER, via, path BLOB) WITHOUT ROWID")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM walk").fetchone()[0]
+
+    def _getMany(self, values):
+        rows = {}
+        for i in range(0, len(values), QUERY_CHUNK):
+            chunk = [_key(n) for n in values[i:i+QUERY_CHUNK]]
+            query = f"SELECT n, stopping, via, path FROM walk WHERE n IN ({','.join('?'*len(chunk))})"
+            for n, stopping, via, path in self.db.execute(query, chunk):
+                rows[_int(n)] = (stopping, marshal.loads(path), _int(via))
+        return rows
+
+    def fetch(self, starts, isKnown):
+        """
+        {start: (stopping time, values, via)} for the starts that were saved and
+        every walk they join, following via until a start isKnown already.
+        One query per chunk of each level of joins, not per step.
+        """
+        hits = {}
+        frontier = list({int(n) for n in starts if not isKnown(int(n))})
+        while frontier:
+            found = self._getMany(frontier)
+            hits.update(found)
+            frontier = list({row[2] for row in found.values()
+                             if row[2] is not None and row[2] not in hits and not isKnown(row[2])})
+        return hits
+
+    def save(self, starts, successorOf, stoppingTime, hits=None):
+        """
+        Save a walk for every start that isn't cached yet, read from the finished
+        graph or store through successorOf and stoppingTime. Values of the fetched
+        hits are already saved, new walks stop at them.
+        """
+        hits = hits or {}
+        new = [n for n in dict.fromkeys(starts) if n not in hits]
+        if not new:
+            return
+
+        walked = {v: start for start, row in hits.items() for v in row[1]} # Value -> start of the walk holding it
+        records = []
+        for start in new:
+            if start in walked:
+                # Lies on an earlier walk: no values of its own, the trajectory goes on in that walk
+                records.append((_key(start), stoppingTime(start), _key(walked[start]), marshal.dumps([])))
+                continue
+            path = []
+            n = start
+            while n != 1 and n not in walked:
+                path.append(n)
+                walked[n] = start
+                n = successorOf(n)
+            records.append((_key(start), stoppingTime(start), None if n == 1 else _key(walked[n]), marshal.dumps(path)))
+
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO walk VALUES (?, ?, ?, ?)", records)
+
+
+def complete_walks(hits, isKnown):
+    """
+    The fetched walks whose chain of joins reaches 1 or a known value, so their
+    values can go in whole and in any order. isKnown must know 1.
+    """
+    complete = set()
+    for start in hits:
+        chain = []
+        n = start
+        while n in hits and n not in complete:
+            chain.append(n)
+            n = hits[n][2]
+            if n is None or isKnown(n):
+                complete.update(chain)
+                break
+        else:
+            if n in complete:
+                complete.update(chain)
+    return complete
+
+
+def cached_path(hits, n, isKnown):
+    """
+    n's trajectory from the fetched walks: (the values from n on that aren't known
+    yet, n's stopping time, the known value they join), or None if n wasn't saved
+    as a start or the walks it joins don't reach a known value. isKnown must know 1.
+    """
+    if n not in hits:
+        return None
+
+    stopping, values, via = hits[n]
+    path = []
+    i = 0
+    while True:
+        for v in values[i:]:
+            if isKnown(v):
+                return path, stopping, v
+            path.append(v)
+
+        # Continue in the walk this one joined, from the value it joined at
+        if values:
+            joined = 3*values[-1] + 1 if values[-1] % 2 else values[-1] // 2
+        else:
+            joined = n # A start without values of its own lies on the walk it names
+        if joined == 1 or isKnown(joined):
+            return path, stopping, joined
+        if via not in hits:
+            return None
+        _, values, via = hits[via]
+        i = values.index(joined)
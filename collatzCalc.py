@@ -1,73 +1,204 @@
-import sympy
+# Heavy modules (networkx, pandas, InquirerPy, pyarrow) are imported by the stage that uses them,
+# so startup and a plain Mermaid export stay light; benchmarks.py --check-startup guards this
 import base64
+import gc
 import json
-from fractions import Fraction
 import os 
-import networkx as nx
-from networkx.readwrite import json_graph
-from dataclasses import dataclass
+import warnings
+import zlib
 import re 
-import itertools
+from bisect import bisect_right
+from collatzStore import CollatzStoreGraph, build_store
+from fractionForm import FractionForm
+from collatzBatch import TrajectoryBatch, batch_trajectories
+from inverseTree import inverse_tree_levels
+from treeExport import export_tree_to_newick
+from graphLayout import export_graph_to_svg
+from chainView import ChainView
+from collatzCache import TrajectoryCache, cached_path
+from sideInfos import attach_side_infos, node_columns, valueArray
+from pipelineStats import NO_STATS, PipelineStats
+from rangeSpec import spec_numbers
+from recordHolders import stream_leaders
+from columnarExport import export_nodes_to_arrow, export_nodes_to_npz, export_nodes_to_parquet
+
+
+def addNumberToCollatzGraph(G, n,sideInfos=None, determineColor=None, stats=NO_STATS):
+    
+    sideInfos = sideInfos or {}
 
-@dataclass
-class RegexEqual(str):
-    string: str
-    match: re.Match = None
+    def fillNode(n, fraction_form, stopping_time):
+        G.nodes[n]["MapFromOne"] = fraction_form
+        G.nodes[n]["StoppingTime"] = stopping_time
+        for title, f in sideInfos.items():
+            G.nodes[n][title] = f(n, G)
+        
+        if determineColor:
+            G.nodes[n]["color"] = determineColor(n,G)
 
-    def __eq__(self, pattern):
-        self.match = re.search(pattern, self.string)
-        return self.match is not None
-    
-    def __getitem__(self, group):
-        return self.match[group]
+    if n < 1:
+        raise ValueError(f"{n} has no Collatz trajectory")
 
+    if "MapFromOne" not in G.nodes.get(1, {}):
+        G.add_node(1)
+        fillNode(1, FractionForm(), 0)
 
-def incLast(l):
-        if len(l) > 0:
-            l[-1] = l[-1]+1
-        return l
+    # Walk forward only until the trajectory joins a node that is already known,
+    # so the cost is proportional to the new nodes and not to the whole path
+    path = []
+    while "MapFromOne" not in G.nodes.get(n, {}):
+        path.append(n)
+        n = 3*n+1 if n %2==1 else n//2
 
-def addNumberToCollatzGraph(G, n):
-    
-    def getFractionForm(n):
-        
-        next_num = 0
-        fraction_form = None
-        
-        if n==1:
+    if stats.enabled:
+        # Reused: one per walk that joined a node an earlier walk created, i.e. anything but the seed 1
+        stats.count("nodes created", len(path))
+        stats.count("nodes reused", int(n != 1))
 
-            return [0]
+    fraction_form = G.nodes[n]["MapFromOne"]
+    stopping_time = G.nodes[n]["StoppingTime"]
 
-        if n %2==1:
-            next_num = 3*n+1
-            fraction_form = getFractionForm(next_num) + [0]
-        
-        else:
-            next_num = n//2
-            fraction_form = incLast(getFractionForm(next_num))
-        
-        # print(f'{n}: {fraction_form}')
-        G.add_edge(n, next_num)
-        if "MapFromOne" not in G.nodes[n]:
-            G.nodes[n]["MapFromOne"] = fraction_form.copy() #Prevents the adding one to same list in memory as the privous one
-        return fraction_form
+    # Fill the new nodes backwards from the known node's stored data
+    for prev in reversed(path):
+        fraction_form = FractionForm.fromSuccessor(prev, fraction_form) #Shares the runs with the successor instead of copying them
+        stopping_time += 1
+
+        G.add_edge(prev, n)
+        fillNode(prev, fraction_form, stopping_time)
+        n = prev
 
-    getFractionForm(n)
-    #G.nodes[1]["MapFromOne"] =[]
-    return G #, getFractionForm(n)
+    return G
+
+
+def addCachedTrajectories(G, itr, cached, stats=NO_STATS):
+    # The starts the cache has go in with one bulk call per run of hits, the others are walked
+    if not cached:
+        for n in stats.meter(itr):
+            addNumberToCollatzGraph(G, n, stats=stats)
+        return G
+
+    forms = {} # Pending nodes: value -> (MapFromOne, StoppingTime)
+    nodes, edges = [], []
+
+    def isKnown(v):
+        return v in forms or (v in G and "MapFromOne" in G.nodes[v])
+
+    def flush():
+        G.add_nodes_from(nodes)
+        G.add_edges_from(edges)
+        forms.clear()
+        nodes.clear()
+        edges.clear()
+
+    addNumberToCollatzGraph(G, 1) # Seeds 1
+    # Nothing built here has reference cycles, collections would only rescan the growing graph
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for n in stats.meter(itr):
+            found = cached_path(cached, n, isKnown)
+            if found is None:
+                if nodes:
+                    flush()
+                addNumberToCollatzGraph(G, n, stats=stats)
+                continue
+
+            path, _, n = found
+            if stats.enabled:
+                stats.count("nodes created", len(path))
+                stats.count("nodes reused", int(n != 1))
+            fraction_form, stopping_time = forms[n] if n in forms else (G.nodes[n]["MapFromOne"], G.nodes[n]["StoppingTime"])
+            for prev in reversed(path):
+                fraction_form = FractionForm.fromSuccessor(prev, fraction_form)
+                stopping_time += 1
+                forms[prev] = fraction_form, stopping_time
+                nodes.append((prev, {"MapFromOne": fraction_form, "StoppingTime": stopping_time}))
+                edges.append((prev, n))
+                n = prev
+        if nodes:
+            flush()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return G
 
 # Example usage
 
 
-def generate_collatz(itr):
+def graph_peaks(g, itr, stats):
+    # Nodes created and reused are counted by the builders, while they walk
+    trajectory_lengths = node_columns(g, valueArray(itr))["StoppingTime"]
+    stats.peak("max trajectory length", int(trajectory_lengths.max(initial=0)))
+    stats.peak("max value", max(g))
+
+
+def generate_collatz(itr,sideInfos=None, determineColor=None, compact=False, workers=1, cache=None, stats=NO_STATS):
+    if compact or workers > 1:
+        with stats.stage("generate"):
+            g = generate_collatz_store(itr,sideInfos=sideInfos, determineColor=determineColor, workers=workers, cache=cache, stats=stats)
+        if stats.enabled:
+            graph_peaks(g, itr, stats)
+        if compact:
+            return g # Side infos are computed lazily, within the exporters' stages
+        with stats.stage("side-info"):
+            return g.to_networkx()
+
+    import networkx as nx
+
     G = nx.DiGraph()
+    G.add_node(1)
+
+    with stats.stage("generate"):
+        cached = cache.fetch(itr, G.__contains__) if cache is not None else {}
+
+        addCachedTrajectories(G, itr, cached, stats=stats)
 
-    for n in itr:
-        addNumberToCollatzGraph(G,n)
+    # Side infos run once over the finished graph instead of once per node while it is built
+    with stats.stage("side-info"):
+        attach_side_infos(G, sideInfos, determineColor)
+
+    if cache is not None:
+        with stats.stage("cache save"):
+            cache.save(itr, lambda n: next(G.successors(n)), lambda n: G.nodes[n]["StoppingTime"], cached)
+
+    if stats.enabled:
+        graph_peaks(G, itr, stats)
 
     return G
 
-def generate_mermaid_link(graph_code):
+def generate_collatz_store(itr,sideInfos=None, determineColor=None, workers=1, cache=None, stats=NO_STATS):
+    # Array backed store, an order of magnitude smaller than the nx.DiGraph for big ranges
+    store = build_store(itr, workers=workers, cache=cache, stats=stats)
+    return CollatzStoreGraph(store, sideInfos=sideInfos, determineColor=determineColor)
+
+def generate_inverse_tree(depth=None, bound=None, sideInfos=None, determineColor=None, stats=NO_STATS):
+    # Grown from 1 level by level, the same graph generate_collatz builds for the tree's nodes
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_node(1, MapFromOne=FractionForm(), StoppingTime=0)
+
+    with stats.stage("generate"):
+        successors = [1]
+        for stopping_time, (values, parents, forms) in enumerate(inverse_tree_levels(depth, bound), 1):
+            values = values.tolist()
+            G.add_nodes_from((n, {"MapFromOne": form, "StoppingTime": stopping_time}) for n, form in zip(values, forms))
+            G.add_edges_from(zip(values, (successors[p] for p in parents.tolist())))
+            successors = values
+
+    with stats.stage("side-info"):
+        attach_side_infos(G, sideInfos, determineColor)
+
+    if stats.enabled:
+        stats.count("nodes created", len(G) - 1)
+        stats.peak("max trajectory length", stopping_time if len(G) > 1 else 0)
+        stats.peak("max value", max(G))
+
+    return G
+
+MERMAID_LINK_BUDGET = 64_000 # Characters, longer links make browsers choke
+
+def encode_mermaid_link(graph_code, compress=True):
     # Define the state object
     state = {
         "code": graph_code,
@@ -78,18 +209,113 @@ def generate_mermaid_link(graph_code):
     # Convert to JSON string
     json_str = json.dumps(state)
     
-    # Encode to Base64
-    # Note: Use urlsafe_b64encode if you find padding issues, 
-    # but standard b64 is usually fine for mermaid.live
+    if compress:
+        # Same as pako.deflate + url safe base64 without padding, which mermaid.live decodes
+        encoded = base64.urlsafe_b64encode(zlib.compress(json_str.encode('utf-8'), 9)).decode('utf-8').rstrip("=")
+        return f"https://mermaid.live/view#pako:{encoded}"
+
     encoded = base64.b64encode(json_str.encode('utf-8')).decode('utf-8')
-    
     return f"https://mermaid.live/view#base64:{encoded}"
 
+MERMAID_STATEMENT = re.compile(r"\n(?=n\d)") # Node labels span several lines, statements start with a node id
+
+def mermaid_statement_ends(graph_code):
+    # Where each statement ends: the header, node 1 and then one edge per statement
+    return [m.start() for m in MERMAID_STATEMENT.finditer(graph_code)] + [len(graph_code)]
+
+def prune_mermaid_code(graph_code, keep, ends=None):
+    # Edges are written from 1 outwards, so the first statements form a connected graph
+    ends = ends or mermaid_statement_ends(graph_code)
+    return graph_code[:ends[1 + keep]] + f"\n%% pruned: {keep} of {len(ends) - 2} edges"
+
+def mermaid_link_capacity(graph_code, compress=True, budget=MERMAID_LINK_BUDGET, chunk=1 << 16):
+    """
+    About how many characters of graph_code fit in a link of budget characters, None
+    if all of them do. zlib is fed the code a chunk at a time and stopped as soon as
+    its output is over the budget, so a huge graph costs about as much as the part that fits.
+    """
+    size = budget*3//4 # Base64 makes 4 characters of every 3 bytes
+    if not compress:
+        return size if len(graph_code) > size else None
+
+    z = zlib.compressobj(9)
+    data = graph_code.encode('utf-8')
+    written = 0
+    for i in range(0, len(data), chunk):
+        written += len(z.compress(data[i:i+chunk]))
+        if written > size:
+            return i
+    return None
+
+def fit_mermaid_link(graph_code, compress=True, budget=MERMAID_LINK_BUDGET):
+    """
+    (link, None), or when the link is over the budget, (link to a prefix of the edges
+    that fits, edges kept). The prefix is searched around the capacity estimate and
+    is within 1% of the largest one that fits.
+    """
+    capacity = mermaid_link_capacity(graph_code, compress, budget) if budget else None
+    if capacity is None:
+        l = encode_mermaid_link(graph_code, compress)
+        if not budget or len(l) <= budget:
+            return l, None
+        capacity = len(graph_code)
+
+    ends = mermaid_statement_ends(graph_code)
+    edges = len(ends) - 2
+    fits = lambda keep: len(encode_mermaid_link(prune_mermaid_code(graph_code, keep, ends), compress)) <= budget
+
+    # Bracket the answer around the estimate with growing steps, then bisect: lo fits (or is 0), bad doesn't
+    lo, bad = 0, edges
+    k = min(max(bisect_right(ends, capacity) - 2, 1), edges - 1)
+    step = max(1, k//16)
+    if fits(k):
+        lo = k
+        while lo + step < bad and fits(lo + step):
+            lo, step = lo + step, 2*step
+        bad = min(bad, lo + step)
+    else:
+        bad = k
+        while bad - step > lo and not fits(bad - step):
+            bad, step = bad - step, 2*step
+        lo = max(lo, bad - step)
+
+    while bad - lo > max(1, lo//100):
+        mid = (lo + bad)//2
+        if fits(mid):
+            lo = mid
+        else:
+            bad = mid
+    return encode_mermaid_link(prune_mermaid_code(graph_code, lo, ends), compress), lo
 
+def generate_mermaid_link(graph_code, compress=True, budget=MERMAID_LINK_BUDGET):
+    l, kept = fit_mermaid_link(graph_code, compress, budget)
 
-def generate_mermaid_code(g,fileName,sideInfos=None, determineColor=None):
-    
-    fileName = fileName + f'({", ".join(sideInfos.keys()) if isinstance(sideInfos, dict) else ""})'
+    if kept is not None:
+        warnings.warn(f"mermaid code of {len(graph_code)} characters doesn't fit a link of {budget} characters; "
+                      f"linking a graph pruned to its first {kept} edges instead")
+
+    print("\n link to graph")
+    print(l)
+    print()
+
+    return l
+
+
+MERMAID_HEADER = """---
+config:
+   flowchart:
+    nodeSpacing: 100
+    rankSpacing: 120
+---
+flowchart TD
+classDef red stroke:red,stroke-width: 3px;
+classDef green stroke:green,stroke-width: 3px;
+classDef blue stroke:blue,stroke-width: 3px;
+"""
+
+def write_mermaid_code(g, f, sideInfos=None, determineColor=None, printNodes=False):
+    # Streams the graph to an open file, the graph itself is left untouched
+    detailed = set()
     getNodeID = lambda nodeNum: f'n{str(nodeNum)}'
 
 
@@ -98,94 +324,199 @@ def generate_mermaid_code(g,fileName,sideInfos=None, determineColor=None):
         s = f'["`**{n}**'
         
         if sideInfos:
-            s = s + '\n'
-            for title, f in sideInfos.items():
-                r = f(n, g)
+            s = s + f'\n**MapToOne**: {g.nodes[n].get("MapFromOne","")}'+ '\n'
+            for title in sideInfos.keys():
+                r =  g.nodes[n][title]
                 if str(r):
-                    g.nodes[n][title] = r
                     s = s + f'\n**{title}**: {r}'
-        
+
+
+
         s = s +'`"]'
 
         if determineColor:
-           c = determineColor(n,g)
+           c = g.nodes[n]["color"]
            if c:
                s = s + f':::{c}'
 
-        g.nodes[n]["detailedInCode"]=True
+        detailed.add(n)
         return s
 
-    getNodeText = lambda n: getNodeID(n)+ ("" if g.nodes[node].get("detailedInCode",False) else getNodeDetails(n))
+    getNodeText = lambda n: getNodeID(n)+ ("" if n in detailed else getNodeDetails(n))
+    edgeLabel = getattr(g, "edgeLabel", lambda n, m: "") # Collapsed chains of a ChainView
+    getArrow = lambda n, m: f'-->|"{label}"|' if (label := edgeLabel(n, m)) else '-->'
 
 
-    mermaid_code = """---
-config:
-   flowchart:
-    nodeSpacing: 100
-    rankSpacing: 120
----
-flowchart TD
-classDef red stroke:red,stroke-width: 3px;
-classDef green stroke:green,stroke-width: 3px;
-classDef blue stroke:blue,stroke-width: 3px;
-"""
-    mermaid_code =mermaid_code + f'\n{getNodeID(1)+getNodeDetails(1)}'
-
+    f.write(MERMAID_HEADER)
+    f.write(f'\n{getNodeID(1)+getNodeDetails(1)}')
 
     for node in g: 
-        print(f'{node}->{list(g.neighbors(node))}')
+        if printNodes:
+            print(f'{node}->{list(g.neighbors(node))}')
         for niehgbour in g.neighbors(node):
-            mermaid_code += f'\n{getNodeText(node)}-->{getNodeText(niehgbour)}'
+            f.write(f'\n{getNodeText(node)}{getArrow(node, niehgbour)}{getNodeText(niehgbour)}')
+
+
+def generate_mermaid_code(g,fileName,sideInfos=None, determineColor=None, printNodes=False):
+    
+    fileName = fileName + f'({", ".join(sideInfos.keys()) if isinstance(sideInfos, dict) else ""})'
 
     os.makedirs('./mermaid_graphs', exist_ok=True)
     
     file_path = f'./mermaid_graphs/{fileName}.mmd'
-    
-    if not os.path.isfile(file_path): #If a graph file was created already, a link was appened too
+    new_file = not os.path.isfile(file_path) #If a graph file was created already, a link was appened too
+        
+    with open(file_path, "w", buffering=1 << 16) as f:
+        write_mermaid_code(g, f, sideInfos, determineColor, printNodes)
+
+    if new_file:
+        with open(file_path) as f:
+            mermaid_code = f.read()
         with open('./graphLinks.md', "a") as f:
             f.write(f"* [{fileName}]({generate_mermaid_link(mermaid_code)})\n") 
-        
-    with open(file_path, "w") as f:
-        f.write(mermaid_code)
+
+    return file_path
 
 
 def interpret_input(s):
-    itr = None
-    match RegexEqual(s):
-        case '^([0-9]*)$' as capture:
-            print(f'number {capture[1]}')
-            itr = [int(capture[1])]
-
-        case '^([0-9]*)?-([0-9]*)$' as capture:
-            print(f'range4-4 min:{capture[1] or 3} max:{capture[2]}')
-            itr = range(int(capture[1] or 3), int(capture[2])+1)
-        
-        case r"^(\d+)(\s*\,\s*\d+)*$" as capture:
-            print("list")
-            
-            itr = [int(n) for n in re.findall(r"\d+", capture[0])]
-            
-        case _:
-            print('wrong, try again')
-            raise SyntaxError("Wrong try again")
-    
+    # A list for plain numbers, a range for a single range and a lazy RangeSpec for unions, see parse_spec
+    try:
+        itr = spec_numbers(s)
+    except SyntaxError:
+        print('wrong, try again')
+        raise
+
+    if isinstance(itr, list):
+        print(f'number {itr[0]}' if len(itr) == 1 else "list")
+    elif isinstance(itr, range):
+        print(f'range min:{itr.start} max:{itr[-1] if itr else itr.start} step:{itr.step}')
+    else:
+        print(f'{len(itr)} numbers in {len(itr.parts)} ranges')
     return itr
     
+def export_nodes_to_csv(g,fileName,sideInfos=None, determineColor=None):
+    import pandas as pd
 
+    if isinstance(g, TrajectoryBatch):
+        df = g.to_dataframe(sideInfos, determineColor)
+    else:
+        columns = ["MapFromOne", *(sideInfos or {}).keys(), "color"]
 
+        # One pass over the nodes, works for both nx.DiGraph and CollatzStoreGraph
+        df = pd.DataFrame.from_dict(
+            {n: [data.get(c) for c in columns] for n, data in g.nodes.items()},
+            orient="index", columns=columns)
 
-def main(): 
+    df= df.sort_index(ascending=True)
+    
+    os.makedirs('./graph_csvs', exist_ok=True)
+
+    
+    file_path = f'./graph_csvs/{fileName}.csv'
+
+    df.to_csv(file_path)
+    return file_path
+
+EXPORT_OPTIONS = {
+   
+    "Mermaid Graph": generate_mermaid_code,
+      "Nodes CSV": export_nodes_to_csv,
+      "Nodes Parquet": export_nodes_to_parquet,
+      "Nodes Arrow": export_nodes_to_arrow,
+      "Nodes NPZ": export_nodes_to_npz,
+      "Newick Tree": export_tree_to_newick,
+      "SVG Layout": export_graph_to_svg,
+    #  "Text File": None
+}
+
+DEFAULT_EXPORT_OPTIONS = ["Mermaid Graph"]
+
+def run_export(option, G, graphName, sideInfos=None, determineColor=None, stats=NO_STATS):
+    # Exporters return the path they wrote, its size is the bytes written
+    with stats.stage(f'export: {option}'):
+        file_path = EXPORT_OPTIONS[option](G, graphName, sideInfos, determineColor)
+    if stats.enabled and file_path:
+        stats.count(f'bytes written: {option}', os.path.getsize(file_path))
+
+def chooseExport(G, graphName,sideInfos=None, determineColor=None, stats=NO_STATS):
+    from InquirerPy import inquirer
+    from InquirerPy.base import Choice
+
+    selected = inquirer.checkbox(
+        message="Choose methods to export the graph:",
+        choices = [ Choice(k, enabled= (k in DEFAULT_EXPORT_OPTIONS)) for k in EXPORT_OPTIONS.keys()],
+        validate=lambda result: len(result) >= 1,
+        invalid_message="should be at least 1 selection",
+        instruction="(select at least 1)",
+    ).execute()
+
+    for choise in selected:
+        run_export(choise, G, graphName, sideInfos, determineColor, stats)
+
+
+def r(user_numbers,graphName,sideInfos=None, determineColor=None, compact=False, batch=False, workers=1, cache=None, stats=NO_STATS, compress=False, leaders=0):
+    
+    if leaders:
+        # Only the top `leaders` starts per metric and the record holders, in constant memory
+        with stats.stage("generate"):
+            board = stream_leaders(user_numbers, k=leaders)
+        run_export("Nodes CSV", board, f'{graphName} leaders', sideInfos, determineColor, stats)
+        return
+
+    if batch and isinstance(user_numbers, range):
+        # The batch engine has no graph, its columns only go to the Nodes CSV
+        with stats.stage("generate"):
+            trajectories = batch_trajectories(user_numbers)
+        if stats.enabled:
+            stats.count("nodes created", len(trajectories))
+            stats.peak("max trajectory length", int(trajectories.columns["StoppingTime"].max(initial=0)))
+            stats.peak("max value", max(trajectories.columns["Peak"].tolist(), default=0))
+        run_export("Nodes CSV", trajectories, graphName, sideInfos, determineColor, stats)
+        return
+
+    G = generate_collatz(user_numbers,sideInfos=sideInfos, determineColor=determineColor, compact=compact, workers=workers, cache=cache, stats=stats)
+    if compress:
+        with stats.stage("compress"):
+            G = ChainView(G, keep=user_numbers) # Straight line chains become labelled edges
+    chooseExport(G, graphName,sideInfos=sideInfos, determineColor=determineColor, stats=stats)
+
+
+
+def write_logs(prompt, consolidated=False):
+    # collatz_calcs logs for every number of an input spec, or one long file with consolidated
+    from trajectoryLog import generate_trajectory_logs
+
+    user_numbers = interpret_input(prompt)
+    generate_trajectory_logs(user_numbers, consolidated=consolidated, name=prompt)
+
+
+def main(workers=1, cache_path=None, stats_path=None, live=False): 
+    # stats_path: where to dump the stage times and counters as JSON, live: print numbers/sec
+    # cache_path: opt in trajectory cache (e.g. collatzCache.DEFAULT_CACHE_PATH). The graph gets every
+    # node either way, so a warm cache saves no work and its lookups make a run slower than none
+    stats = PipelineStats(live=live) if stats_path or live else NO_STATS
     try:
         
         prompt = input("Enter number/s: \n")
-        user_numbers = interpret_input(prompt)
-        G = generate_collatz(user_numbers)
-        generate_mermaid_code(G,prompt,{"MapFromOne": lambda n, g: g.nodes[n].get("MapFromOne","")},lambda n,g: 'green' if n%2 else '')
+        with stats.stage("parse"):
+            user_numbers = interpret_input(prompt)
+        #G = generate_collatz(user_numbers)
+        cache = TrajectoryCache(cache_path) if cache_path else None
+        try:
+            r(user_numbers,prompt,{ "Mod6": lambda n, g: n%6},lambda n,g: 'green' if n%2 else '', workers=workers, cache=cache, stats=stats)
+        finally:
+            if cache is not None:
+                cache.close()
+        # export_nodes_to_csv(G,prompt,{"MapFromOne": lambda n, g: g.nodes[n].get("MapFromOne","")},lambda n,g: 'green' if n%2 else '')
     except SyntaxError:
-        main()
+        main(workers, cache_path, stats_path, live)
+        return
+
+    if stats_path:
+        stats.dump(stats_path)
 
 
 
 if __name__ == "__main__":
-  while True:
+#   while True:
     main()
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Headless runs of collatzCalc, no prompts:
+
+    python collatzJobs.py 3-40 42-60 --export "Mermaid Graph" "Nodes CSV" --side-info Mod6 --color odd
+    python collatzJobs.py --jobs jobs.json --out ./exports --stats stats.json
+
+A job file is a JSON list of jobs, each with a "spec" and optionally "exports",
+"sideInfos", "color", "compress", "leaders", "name" and "out"; missing fields come from the arguments.
+    [{"spec": "3-40"}, {"spec": "42-60", "exports": ["Nodes CSV"], "color": null}]
+
+All jobs run in one process on one shared graph, so overlapping specs only
+compute their shared trajectories once. --cache also saves them to a trajectory cache.
+"""
+import argparse
+import json
+import os
+import sys
+from contextlib import contextmanager
+import collatzCalc as c
+from chainView import ChainView
+from collatzCache import TrajectoryCache
+from pipelineStats import NO_STATS, PipelineStats
+from sideInfos import attach_side_infos
+
+SIDE_INFO_OPTIONS = {
+    "Mod6": lambda n, g: n%6,
+    "Mod4": lambda n, g: n%4,
+    "StoppingTime": lambda n, g: g.nodes[n]["StoppingTime"],
+}
+
+COLOR_OPTIONS = {
+    "odd": lambda n, g: 'green' if n%2 else '',
+}
+
+DEFAULT_JOB = {
+    "exports": c.DEFAULT_EXPORT_OPTIONS,
+    "sideInfos": ["Mod6"],
+    "color": "odd",
+    "compress": False,
+    "leaders": 0,
+    "out": ".",
+}
+
+
+class GraphSession:
+    """
+    One nx.DiGraph shared by many jobs. Every job extends it with its inputs and
+    gets its own graph copied out of it, identical to what generate_collatz would
+    build for the job alone.
+    """
+
+    def __init__(self, cache=None, stats=NO_STATS):
+        import networkx as nx
+
+        self.G = nx.DiGraph()
+        self.G.add_node(1)
+        self.cache = cache
+        self.stats = stats
+
+    def graph_for(self, itr, sideInfos=None, determineColor=None):
+        import networkx as nx
+
+        G = self.G
+
+        with self.stats.stage("generate"):
+            cached = self.cache.fetch(itr, G.__contains__) if self.cache is not None else {}
+            c.addCachedTrajectories(G, itr, cached, stats=self.stats)
+
+            # Same node order as a fresh graph: walk until a copied node, add the path backwards
+            H = nx.DiGraph()
+            H.add_node(1, **G.nodes[1])
+            for n in itr:
+                path = []
+                while n not in H:
+                    path.append(n)
+                    n = next(G.successors(n))
+                for prev in reversed(path):
+                    H.add_edge(prev, n)
+                    H.nodes[prev].update(G.nodes[prev])
+                    n = prev
+
+        with self.stats.stage("side-info"):
+            attach_side_infos(H, sideInfos, determineColor)
+
+        if self.cache is not None:
+            with self.stats.stage("cache save"):
+                self.cache.save(itr, lambda n: next(H.successors(n)), lambda n: H.nodes[n]["StoppingTime"], cached)
+
+        return H
+
+    def run(self, job):
+        job = {**DEFAULT_JOB, **job}
+        sideInfos = {title: SIDE_INFO_OPTIONS[title] for title in job["sideInfos"] or []}
+        determineColor = COLOR_OPTIONS[job["color"]] if job["color"] else None
+
+        with self.stats.stage("parse"):
+            user_numbers = c.interpret_input(job["spec"])
+
+        if job["leaders"]:
+            # No graph, only the leaders' CSV; the range is streamed in chunks
+            with working_directory(job["out"]):
+                c.r(user_numbers, job.get("name") or job["spec"], sideInfos, determineColor,
+                    stats=self.stats, leaders=job["leaders"])
+            return
+
+        G = self.graph_for(user_numbers, sideInfos, determineColor)
+
+        if self.stats.enabled and len(G) > 1:
+            self.stats.peak("max trajectory length", max(data["StoppingTime"] for data in G.nodes.values()))
+            self.stats.peak("max value", max(G))
+
+        if job["compress"]:
+            with self.stats.stage("compress"):
+                G = ChainView(G, keep=user_numbers)
+
+        with working_directory(job["out"]):
+            for option in job["exports"]:
+                c.run_export(option, G, job.get("name") or job["spec"], sideInfos, determineColor, self.stats)
+
+
+@contextmanager
+def working_directory(path):
+    # The exporters write relative to the working directory
+    os.makedirs(path, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def load_jobs(path):
+    with open(path) as f:
+        jobs = json.load(f)
+    return [{"spec": job} if isinstance(job, str) else job for job in jobs]
+
+
+def run_jobs(jobs, cache_path=None, stats=NO_STATS):
+    cache = TrajectoryCache(cache_path) if cache_path else None
+    try:
+        session = GraphSession(cache, stats)
+        for job in jobs:
+            session.run(job)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("specs", nargs="*", help="input specs as typed at the prompt, e.g. 3-40 or 5,7,9")
+    parser.add_argument("--jobs", help="JSON job file, run after the specs")
+    parser.add_argument("--export", nargs="+", choices=list(c.EXPORT_OPTIONS), default=DEFAULT_JOB["exports"])
+    parser.add_argument("--side-info", nargs="*", choices=list(SIDE_INFO_OPTIONS), default=DEFAULT_JOB["sideInfos"])
+    parser.add_argument("--color", choices=list(COLOR_OPTIONS), default=DEFAULT_JOB["color"])
+    parser.add_argument("--no-color", action="store_true")
+    parser.add_argument("--compress", action="store_true", help="collapse straight line chains into labelled edges")
+    parser.add_argument("--leaders", type=int, default=0, metavar="K",
+                        help="no graph, a CSV of the top K starts per metric and the record holders")
+    parser.add_argument("--out", default=DEFAULT_JOB["out"], help="directory the exports are written under")
+    parser.add_argument("--cache", help="trajectory cache to warm the graph from and save to, off by default")
+    parser.add_argument("--stats", help="dump stage times and counters as JSON to this path")
+    parser.add_argument("--live", action="store_true", help="print numbers/sec while generating")
+    args = parser.parse_args(argv)
+
+    defaults = {
+        "exports": args.export,
+        "sideInfos": args.side_info,
+        "color": None if args.no_color else args.color,
+        "compress": args.compress,
+        "leaders": args.leaders,
+        "out": args.out,
+    }
+    jobs = [{"spec": spec} for spec in args.specs] + (load_jobs(args.jobs) if args.jobs else [])
+    if not jobs:
+        parser.error("no specs or job file given")
+
+    stats = PipelineStats(live=args.live) if args.stats or args.live else NO_STATS
+    run_jobs([{**defaults, **job} for job in jobs], args.cache, stats)
+    if args.stats:
+        stats.dump(args.stats)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
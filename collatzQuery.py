@@ -0,0 +1,138 @@
+import numpy as np
+from collatzStore import CollatzStore, CollatzStoreGraph, build_store, collatzStep
+from inverseTree import predecessors
+from jumpTable import JUMP_BITS, jump_table
+from sideInfos import UINT64_MAX
+
+
+class CollatzIndex:
+    """
+    Queries over a CollatzStore: its successor array, plus a reverse (child)
+    index built once, so each query costs about the size of its answer.
+    Numbers the store doesn't know yet are added on the way, the index keeps
+    their children in a small side table instead of being rebuilt.
+
+        index = CollatzIndex.build(range(1, 10001))
+        index.path_to_one(27), index.common_merge_point(27, 31)
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+        # Children of the in-range nodes: their values sorted by successor, found with searchsorted
+        known = np.flatnonzero(store.stopping >= 0)
+        known = known[known != 1]
+        successors = store.successor[known]
+        order = np.argsort(successors, kind="stable")
+        self._children = known[order]
+        self._parents = successors[order]
+
+        self._extra = {} # successor -> children that are not in the arrays
+        for m in store.overflow:
+            self._extra.setdefault(collatzStep(m), []).append(m)
+
+    @classmethod
+    def build(cls, itr, workers=1, cache=None):
+        return cls(build_store(itr, workers=workers, cache=cache))
+
+    @classmethod
+    def of(cls, g):
+        # From a generated graph: the store itself, or a store of an nx.DiGraph's nodes and stopping times
+        if isinstance(g, CollatzStore):
+            return cls(g)
+        if isinstance(g, CollatzStoreGraph):
+            return cls(g.store)
+        return cls(CollatzStore.fromStoppingTimes({n: data["StoppingTime"] for n, data in g.nodes.items()}))
+
+    def ensure(self, n):
+        # Adds n's trajectory if it is new, big values stay out of the arrays
+        if n < 1:
+            raise ValueError(f"{n} has no Collatz trajectory")
+        path = []
+        m = n
+        while m not in self.store:
+            path.append(m)
+            m = collatzStep(m)
+        if path:
+            self.store.add(n)
+            for m in path:
+                self._extra.setdefault(collatzStep(m), []).append(m)
+
+    def children(self, n):
+        found = []
+        if n <= UINT64_MAX:
+            lo, hi = np.searchsorted(self._parents, n, side="left"), np.searchsorted(self._parents, n, side="right")
+            found = self._children[lo:hi].tolist()
+        return found + self._extra.get(n, [])
+
+    def stoppingTime(self, n):
+        # New big numbers are jumped through k steps at a time, and not added
+        if n >> JUMP_BITS > 0 and n not in self.store:
+            return jump_table().stoppingTime(n)
+        self.ensure(n)
+        return self.store.stoppingTime(n)
+
+    def mapFromOne(self, n):
+        if n >> JUMP_BITS > 0 and n not in self.store:
+            return jump_table().mapFromOne(n)
+        self.ensure(n)
+        return self.store.mapFromOne(n)
+
+    def path_to_one(self, n):
+        self.ensure(n)
+        path = [n]
+        while n != 1:
+            n = self.store.successorOf(n)
+            path.append(n)
+        return path
+
+    def ancestors(self, n, depth=None, complete=False):
+        """
+        The numbers whose trajectories reach n, as levels: [[k steps before n] for k = 1..depth].
+        Only known numbers unless complete, which grows the whole inverse tree
+        (2n and (n-1)/3) and needs a depth.
+        """
+        if complete and depth is None:
+            raise ValueError("the complete inverse tree needs a depth")
+
+        levels = []
+        frontier = [n]
+        while frontier and (depth is None or len(levels) < depth):
+            if complete:
+                frontier = predecessors(np.array(frontier, dtype=object))[0].tolist()
+            else:
+                frontier = [child for m in frontier for child in self.children(m)]
+            if frontier:
+                levels.append(frontier)
+        return levels
+
+    def common_merge_point(self, a, b):
+        # The first number both trajectories reach: even up the stopping times, then step together
+        self.ensure(a)
+        self.ensure(b)
+        sa, sb = self.store.stoppingTime(a), self.store.stoppingTime(b)
+        while sa > sb:
+            a, sa = self.store.successorOf(a), sa-1
+        while sb > sa:
+            b, sb = self.store.successorOf(b), sb-1
+        while a != b:
+            a, b = self.store.successorOf(a), self.store.successorOf(b)
+        return a
+
+    def starts_through(self, n, N):
+        # All starts <= N whose trajectory passes through n (n itself included), sorted
+        self.ensure(n)
+        limit = min(N, self.store.limit)
+        for m in np.flatnonzero(self.store.stopping[1:limit+1] < 0) + 1:
+            self.ensure(int(m))
+        for m in range(self.store.limit+1, N+1):
+            self.ensure(m)
+
+        found = []
+        stack = [n]
+        while stack:
+            m = stack.pop()
+            if m <= N:
+                found.append(m)
+            stack += self.children(m)
+        return sorted(found)
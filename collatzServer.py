@@ -0,0 +1,288 @@
+"""
+Collatz queries over HTTP/JSON on localhost, for dashboards:
+
+    python collatzServer.py --port 8765
+
+    GET /trajectory?n=27        {"n": 27, "stoppingTime": 111, "path": [27, 82, ...]}
+    GET /stopping-time?n=27     {"n": 27, "stoppingTime": 111}
+    GET /map-from-one?n=27      {"n": 27, "mapFromOne": [1, 1, ...]}
+    GET /mermaid?spec=3-40      the Mermaid code, as in mermaid_graphs
+    GET /link?spec=3-40         {"spec": "3-40:1", "link": "https://mermaid.live/...", "prunedTo": null}
+    GET /health                 {"nodes": ...}
+
+All requests share one warm graph. Rendered answers are kept in an LRU bounded
+by their size in bytes, and concurrent identical requests wait on one computation.
+"""
+import argparse
+import asyncio
+import io
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import collatzCalc as c
+from collatzCache import TrajectoryCache
+from collatzJobs import COLOR_OPTIONS, SIDE_INFO_OPTIONS, GraphSession
+from jumpTable import JUMP_BITS, jump_table
+from rangeSpec import spec_numbers
+
+DEFAULT_PORT = 8765
+RESULT_CACHE_BYTES = 64 << 20
+MAX_SPEC_NUMBERS = 100_000 # Bigger graphs can't be rendered as Mermaid anyway
+SIDE_INFOS = {"Mod6": SIDE_INFO_OPTIONS["Mod6"]} # The same graphs main() draws
+COLOR = COLOR_OPTIONS["odd"]
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class QueryError(Exception):
+    # Becomes a 400 response with the message
+    pass
+
+
+class ResultCache:
+    # LRU of rendered responses, evicting the oldest until their bytes fit in max_bytes
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        size = len(entry[1])
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= len(self._entries.pop(key)[1])
+        self._entries[key] = entry
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= len(self._entries.popitem(last=False)[1][1])
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def number_arg(query):
+    try:
+        n = int(query["n"][0])
+    except (KeyError, ValueError):
+        raise QueryError("expected ?n=<positive integer>")
+    if n < 1:
+        raise QueryError(f"{n} has no Collatz trajectory")
+    return n
+
+
+def spec_arg(query):
+    if "spec" not in query:
+        raise QueryError("expected ?spec=<input spec>, e.g. 3-40")
+    try:
+        itr = spec_numbers(query["spec"][0])
+    except SyntaxError as e:
+        raise QueryError(str(e))
+
+    try:
+        size = len(itr)
+    except OverflowError: # More numbers than a range can count
+        size = None
+    if size is None or size > MAX_SPEC_NUMBERS:
+        raise QueryError(f"spec has {size or 'too many'} numbers, at most {MAX_SPEC_NUMBERS} are rendered")
+    return itr
+
+
+def as_json(data):
+    return "application/json", json.dumps(data).encode()
+
+
+class QueryService:
+    """
+    Answers the queries on one GraphSession. Everything that touches the graph
+    runs on a single worker thread, so the event loop only parses requests and
+    serves cached answers; results are cached by (path, normalized argument).
+    """
+
+    def __init__(self, cache_path=None, result_bytes=RESULT_CACHE_BYTES):
+        self.session = GraphSession()
+        self.results = ResultCache(result_bytes)
+        self.pending = {}
+        self.worker = ThreadPoolExecutor(max_workers=1)
+        if cache_path:
+            # sqlite connections belong to the thread that opened them
+            self.worker.submit(self._open_cache, cache_path).result()
+        self.routes = {
+            "/trajectory": (number_arg, self.trajectory),
+            "/stopping-time": (number_arg, self.stopping_time),
+            "/map-from-one": (number_arg, self.map_from_one),
+            "/mermaid": (spec_arg, self.mermaid),
+            "/link": (spec_arg, self.link),
+        }
+
+    # Computations, on the worker thread
+
+    def _open_cache(self, cache_path):
+        self.session.cache = TrajectoryCache(cache_path)
+
+    def close(self):
+        if self.session.cache is not None:
+            self.worker.submit(self.session.cache.close).result()
+        self.worker.shutdown()
+
+    def _node(self, n):
+        G = self.session.G
+        if "MapFromOne" not in G.nodes.get(n, {}):
+            c.addNumberToCollatzGraph(G, n)
+        return G.nodes[n]
+
+    def trajectory(self, n):
+        stopping_time = self._node(n)["StoppingTime"]
+        path = [n]
+        while n != 1:
+            n = next(self.session.G.successors(n))
+            path.append(n)
+        return as_json({"n": path[0], "stoppingTime": stopping_time, "path": path})
+
+    def _jumped(self, n):
+        # Big numbers the graph doesn't have are jumped through instead of added to it
+        return n >> JUMP_BITS and n not in self.session.G
+
+    def stopping_time(self, n):
+        stopping_time = jump_table().stoppingTime(n) if self._jumped(n) else self._node(n)["StoppingTime"]
+        return as_json({"n": n, "stoppingTime": stopping_time})
+
+    def map_from_one(self, n):
+        form = jump_table().mapFromOne(n) if self._jumped(n) else self._node(n)["MapFromOne"]
+        return as_json({"n": n, "mapFromOne": form.toList()})
+
+    def _mermaid_code(self, itr):
+        f = io.StringIO()
+        c.write_mermaid_code(self.session.graph_for(itr, SIDE_INFOS, COLOR), f, SIDE_INFOS, COLOR)
+        return f.getvalue()
+
+    def mermaid(self, itr):
+        return "text/plain; charset=utf-8", self._mermaid_code(itr).encode()
+
+    def link(self, itr):
+        link, kept = c.fit_mermaid_link(self._mermaid_code(itr))
+        return as_json({"spec": spec_key(itr), "link": link, "prunedTo": kept})
+
+    # Request handling, on the event loop
+
+    async def answer(self, path, query):
+        if path == "/health":
+            return as_json({"nodes": len(self.session.G), "cachedResults": len(self.results),
+                            "cachedBytes": self.results.nbytes})
+        if path not in self.routes:
+            raise LookupError(path)
+
+        parse, compute = self.routes[path]
+        arg = await asyncio.get_running_loop().run_in_executor(None, parse, query) # Off the loop, other clients keep being served
+        key = (path, spec_key(arg))
+
+        entry = self.results.get(key)
+        if entry is not None:
+            return entry
+
+        # Identical requests in flight share the first one's computation
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.worker, compute, arg)
+            self.pending[key] = future
+            try:
+                entry = await asyncio.shield(future) # A client going away doesn't cancel the others' answer
+                self.results.put(key, entry)
+                return entry
+            finally:
+                del self.pending[key]
+        return await asyncio.shield(future)
+
+
+def spec_key(arg):
+    """
+    The same numbers give the same key however the spec was typed; ranges
+    without numbers share a key of their own.
+
+        >>> spec_key(range(1, 11, 3)) == spec_key(range(1, 12, 3))
+        True
+        >>> spec_key(range(5, 5)) == spec_key(range(5, 6))
+        False
+    """
+    if isinstance(arg, int):
+        return arg
+    if isinstance(arg, range):
+        return f'{arg.start}-{arg[-1]}:{arg.step}' if arg else ""
+    if isinstance(arg, list):
+        return ",".join(map(str, arg))
+    return ",".join(spec_key(part) for part in arg.parts)
+
+
+def response(status, entry, keep_alive=True):
+    content_type, body = entry
+    head = (f'HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode() + body
+
+
+async def handle(service, reader, writer):
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            lines = request.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ", 2)
+            headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            url = urlsplit(target)
+            try:
+                if method != "GET":
+                    status, entry = 405, as_json({"error": "only GET"})
+                else:
+                    status, entry = 200, await service.answer(url.path, parse_qs(url.query))
+            except QueryError as e:
+                status, entry = 400, as_json({"error": str(e)})
+            except LookupError:
+                status, entry = 404, as_json({"error": f"no such query {url.path}", "queries": [*service.routes, "/health"]})
+            except Exception as e:
+                status, entry = 500, as_json({"error": repr(e)})
+
+            writer.write(response(status, entry, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, cache_path=None, result_bytes=RESULT_CACHE_BYTES):
+    service = QueryService(cache_path, result_bytes)
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+    print(f'serving Collatz queries on http://{host}:{port}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache", help="trajectory cache to warm the graph from and save to")
+    parser.add_argument("--result-bytes", type=int, default=RESULT_CACHE_BYTES, help="size of the LRU of rendered answers")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.cache, args.result_bytes))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+import gc
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from collatzCache import complete_walks
+from fractionForm import FractionForm
+from pipelineStats import NO_STATS
+from sideInfos import side_columns
+
+
+def collatzStep(n):
+    return 3*n+1 if n %2==1 else n//2
+
+
+class CollatzStore:
+    """
+    Compact replacement for the nx.DiGraph built by generate_collatz.
+
+    Values up to `limit` live in two flat arrays (successor and stopping time),
+    the values trajectories overshoot into live in a hash index. Node 1 has no
+    successor (stored as 0) and a stopping time of 0.
+    """
+
+    FORM_CACHE_SIZE = 1 << 16
+
+    def __init__(self, limit=1024):
+        self.limit = 0
+        self.successor = np.zeros(1, dtype=np.uint64)
+        self.stopping = np.full(1, -1, dtype=np.int32)
+        self.overflow = {} # n -> stopping time for n > limit, the successor is given by collatzStep
+        self._forms = {1: FractionForm()}
+        self._grow(limit)
+        self.stopping[1] = 0
+
+    @classmethod
+    def fromStoppingTimes(cls, stopping_times):
+        # A store of {n: stopping time} for whole trajectories, e.g. the nodes of a generated nx.DiGraph
+        store = cls(dense_limit(stopping_times))
+        inside = sorted(n for n in stopping_times if n <= store.limit)
+        store.absorb(np.array(inside, dtype=np.uint64), np.array([stopping_times[n] for n in inside], dtype=np.int32),
+                     {n: s for n, s in stopping_times.items() if n > store.limit})
+        return store
+
+    def _grow(self, n):
+        new_limit = max(n, min(2*self.limit, DENSE_MAX))
+
+        successor = np.zeros(new_limit+1, dtype=np.uint64)
+        successor[:self.limit+1] = self.successor
+        stopping = np.full(new_limit+1, -1, dtype=np.int32)
+        stopping[:self.limit+1] = self.stopping
+        self.successor, self.stopping, self.limit = successor, stopping, new_limit
+
+        # Values that were out of range may now fit in the arrays
+        for m in [m for m in self.overflow if m <= new_limit]:
+            self._set(m, self.overflow.pop(m))
+
+    def _set(self, n, stopping_time):
+        if n <= self.limit:
+            self.successor[n] = collatzStep(n)
+            self.stopping[n] = stopping_time
+        else:
+            self.overflow[n] = stopping_time
+
+    def __contains__(self, n):
+        if n <= self.limit:
+            return n >= 1 and self.stopping[n] >= 0
+        return n in self.overflow
+
+    def __len__(self):
+        return int(np.count_nonzero(self.stopping >= 0)) + len(self.overflow)
+
+    def __iter__(self):
+        yield from (int(n) for n in np.flatnonzero(self.stopping >= 0))
+        yield from self.overflow
+
+    def successorOf(self, n):
+        if n == 1:
+            return None
+        return int(self.successor[n]) if n <= self.limit else collatzStep(n)
+
+    def stoppingTime(self, n):
+        return int(self.stopping[n]) if n <= self.limit else self.overflow[n]
+
+    def add(self, n, grow=False):
+        # Returns the known value the walk joined. Values above the limit go to the overflow
+        # index unless grow, which grows the arrays to n as long as that stays under DENSE_MAX
+        if n < 1:
+            raise ValueError(f"{n} has no Collatz trajectory")
+        if grow and self.limit < n <= DENSE_MAX:
+            self._grow(n)
+
+        path = []
+        while n not in self:
+            path.append(n)
+            n = collatzStep(n)
+
+        joined = n
+        stopping_time = self.stoppingTime(n)
+        for prev in reversed(path):
+            stopping_time += 1
+            self._set(prev, stopping_time)
+        return joined
+
+    def addPath(self, path, stopping_time):
+        # New values of one trajectory in bulk, path[i] has stopping time stopping_time - i
+        stoppings = range(stopping_time, stopping_time - len(path), -1)
+        if len(path) < 64: # Not worth the array set up
+            for n, s in zip(path, stoppings):
+                self._set(n, s)
+            return
+
+        limit = self.limit
+        inside = [i for i, n in enumerate(path) if n <= limit]
+        if len(inside) < len(path):
+            self.overflow.update((n, s) for n, s in zip(path, stoppings) if n > limit)
+        if inside:
+            values = np.array([path[i] for i in inside], dtype=np.uint64)
+            self.successor[values] = np.where(values & 1, 3*values+1, values >> 1)
+            self.stopping[values] = np.array([stoppings[i] for i in inside], dtype=np.int32)
+
+    def mapFromOne(self, n):
+        # Walk only until a node whose form was recently built, then build the
+        # new forms from it; the cache is bounded so the store stays compact
+        path = []
+        while n not in self._forms:
+            path.append(n)
+            n = self.successorOf(n)
+
+        fraction_form = self._forms[n]
+        if len(self._forms) + len(path) > self.FORM_CACHE_SIZE:
+            self._forms = {1: self._forms[1]}
+
+        for prev in reversed(path):
+            fraction_form = FractionForm.fromSuccessor(prev, fraction_form)
+            self._forms[prev] = fraction_form
+        return fraction_form
+
+    def known(self):
+        values = np.flatnonzero(self.stopping >= 0)
+        return values, self.stopping[values], dict(self.overflow)
+
+    def absorb(self, values, stoppings, overflow):
+        # Stopping times are fixed by the numbers, so values both stores know are simply kept once
+        if len(values) and int(values[-1]) > self.limit:
+            self._grow(int(values[-1]))
+
+        values = values.astype(np.uint64)
+        self.successor[values] = np.where(values & 1, 3*values+1, values >> 1)
+        self.successor[1] = 0
+        self.stopping[values] = stoppings
+
+        for m, stopping_time in overflow.items():
+            if m not in self:
+                self._set(m, stopping_time)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_forms"] = None # Rebuilt on demand, and deep parent chains don't pickle well
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._forms = {1: FractionForm()}
+
+    def nbytes(self):
+        return self.successor.nbytes + self.stopping.nbytes
+
+
+DENSE_PER_INPUT = 8 # Array slots per input value
+DENSE_MAX = 1 << 27 # About 1.6 GB of arrays, bigger values always go to the overflow index
+
+
+def largest(itr):
+    # Without walking ranges and RangeSpecs
+    if isinstance(itr, range):
+        return itr[-1] if itr.step > 0 else itr[0]
+    if hasattr(itr, "parts"):
+        return max(largest(p) for p in itr.parts)
+    return max(itr)
+
+
+def dense_limit(itr):
+    """
+    Size of the arrays for a store of itr: its largest value, unless that is far
+    more than the number of inputs can use, so a scattered list or a spec like
+    2^40 doesn't allocate an array per value below it.
+    """
+    if not len(itr):
+        return 1024
+    return min(largest(itr), max(1024, DENSE_PER_INPUT*len(itr)), DENSE_MAX)
+
+
+def _add_all(store, itr):
+    # Adds itr and returns the nodes reused: one per walk that joined a node an earlier walk created
+    return sum(store.add(n) != 1 for n in itr)
+
+
+def _build_shard(shard):
+    store = CollatzStore(dense_limit(shard))
+    reused = _add_all(store, shard)
+    return store.known(), reused
+
+
+def build_store(itr, workers=1, cache=None, stats=NO_STATS):
+    """
+    Build a CollatzStore for itr, sharded across a process pool when workers > 1.
+    Each worker builds its own store and the shards are merged into one.
+    With a TrajectoryCache, known trajectories are loaded instead of computed
+    and the new values are saved back.
+    """
+    itr = itr if isinstance(itr, Sequence) else list(itr) # Ranges and RangeSpecs shard without a list
+    store = CollatzStore(dense_limit(itr)) # Values above it go to the overflow index
+
+    starts = itr
+    reused = 0
+    if cache is not None:
+        # Saved walks go in whole, their values don't overlap, only the starts the cache doesn't have are walked
+        hits = cache.fetch(itr, store.__contains__)
+        complete = complete_walks(hits, store.__contains__)
+        for start in complete:
+            stopping, values, _ = hits[start]
+            store.addPath(values, stopping)
+        reused += sum(hits[n][2] is not None for n in itr if n in complete)
+        itr = [n for n in itr if n not in complete]
+
+    if workers <= 1 or len(itr) < workers:
+        reused += _add_all(store, itr)
+    else:
+        # Interleaved shards so every worker gets a similar mix of small and large numbers.
+        # Reuse is counted per shard, walks don't see the nodes of other shards
+        shards = [itr[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (values, stoppings, overflow), shard_reused in pool.map(_build_shard, shards):
+                store.absorb(values, stoppings, overflow)
+                reused += shard_reused
+
+    stats.count("nodes created", len(store) - 1)
+    stats.count("nodes reused", reused)
+
+    if cache is not None:
+        cache.save(starts, store.successorOf, store.stoppingTime, hits)
+
+    return store
+
+
+class _NodeView:
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self):
+        return list(self._graph)
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, n):
+        return n in self._graph
+
+    def __getitem__(self, n):
+        return self._graph.nodeData(n)
+
+    def get(self, n, default=None):
+        return self[n] if n in self else default
+
+    def items(self):
+        return ((n, self[n]) for n in self)
+
+
+class CollatzStoreGraph:
+    """
+    Thin adapter that lets the exporters read a CollatzStore like an nx.DiGraph.
+    Side infos and colors are computed as columns the first time a node's
+    attributes are asked for, so the store should be complete by then.
+    """
+
+    def __init__(self, store, sideInfos=None, determineColor=None):
+        self.store = store
+        self.sideInfos = sideInfos or {}
+        self.determineColor = determineColor
+        self._columns = None
+
+    def __iter__(self):
+        # By stopping time, so every node comes after its successor and the Mermaid
+        # edges are written from 1 outwards, as the sequential builder writes them
+        values, stoppings, overflow = self.store.known()
+        nodes = values.tolist() + list(overflow)
+        stopping = np.concatenate([stoppings, np.fromiter(overflow.values(), dtype=np.int32, count=len(overflow))])
+        return (nodes[i] for i in np.argsort(stopping, kind="stable").tolist())
+
+    def __len__(self):
+        return len(self.store)
+
+    def __contains__(self, n):
+        return n in self.store
+
+    @property
+    def nodes(self):
+        return _NodeView(self)
+
+    def number_of_nodes(self):
+        return len(self.store)
+
+    def neighbors(self, n):
+        successor = self.store.successorOf(n)
+        return iter([] if successor is None else [successor])
+
+    successors = neighbors
+
+    def _sideColumns(self):
+        # Side infos are computed for every node at once, the first time they are needed
+        if self._columns is None:
+            self._columns = {} # Per node side infos reading g.nodes[n] meanwhile see what is done so far
+            self._inRange = np.flatnonzero(self.store.stopping >= 0)
+            overflow = list(self.store.overflow)
+            self._overflowIndex = {m: i+len(self._inRange) for i, m in enumerate(overflow)}
+
+            values = self._inRange.tolist() + overflow
+            for title, column in side_columns(self, values, self.sideInfos, self.determineColor):
+                self._columns[title] = column
+        return self._columns
+
+    def _position(self, n):
+        if n <= self.store.limit:
+            return int(np.searchsorted(self._inRange, n))
+        return self._overflowIndex[n]
+
+    def nodeColumns(self, values):
+        if values.dtype == object:
+            return {"StoppingTime": np.array([self.store.stoppingTime(int(n)) for n in values], dtype=np.int32)}
+
+        # In range values are read from the array at once, only overflow values one by one
+        inside = values <= self.store.limit
+        stopping = np.empty(len(values), dtype=np.int32)
+        stopping[inside] = self.store.stopping[values[inside]]
+        stopping[~inside] = [self.store.overflow[int(n)] for n in values[~inside]]
+        return {"StoppingTime": stopping}
+
+    def nodeData(self, n):
+        if n not in self.store:
+            raise KeyError(n)
+
+        data = {
+            "MapFromOne": self.store.mapFromOne(n),
+            "StoppingTime": self.store.stoppingTime(n),
+        }
+
+        columns = self._sideColumns()
+        if columns:
+            i = self._position(n)
+            for title, column in columns.items():
+                v = column[i]
+                data[title] = v.item() if isinstance(v, np.generic) else v
+        return data
+
+    def to_networkx(self):
+        # Straight from the arrays: nodes, edges and attribute columns in bulk, and
+        # every MapFromOne built once from its successor's, in order of stopping time
+        import networkx as nx
+
+        values, stoppings, overflow = self.store.known()
+        nodes = values.tolist() + list(overflow)
+        successors = self.store.successor[values].tolist() + [collatzStep(m) for m in overflow]
+        stopping = stoppings.tolist() + list(overflow.values())
+        order = np.argsort(np.array(stopping), kind="stable").tolist()
+        side_columns = {title: column.tolist() if isinstance(column, np.ndarray) else column
+                        for title, column in self._sideColumns().items()} # Same node order as known()
+
+        # Nothing built here has reference cycles, collections would only rescan the growing graph
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            forms = {1: FractionForm()}
+            for i in order:
+                n = nodes[i]
+                if n != 1:
+                    forms[n] = FractionForm.fromSuccessor(n, forms[successors[i]])
+
+            # Nodes go in by stopping time too, so the graph iterates like the store adapter
+            columns = {"MapFromOne": [forms[n] for n in nodes], "StoppingTime": stopping, **side_columns}
+            rows = list(zip(*columns.values()))
+            G = nx.DiGraph()
+            G.add_nodes_from((nodes[i], dict(zip(columns, rows[i]))) for i in order)
+            G.add_edges_from((nodes[i], successors[i]) for i in order if nodes[i] != 1)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return G
@@ -0,0 +1,201 @@
+import os
+import tempfile
+import zipfile
+import numpy as np
+from collatzStore import CollatzStoreGraph
+from collatzBatch import TrajectoryBatch
+from sideInfos import UINT64_MAX, side_columns
+
+CHUNK_SIZE = 1 << 16 # Nodes per row group / record batch
+
+
+def _formColumn(forms):
+    # MapFromOne as flat run lengths plus offsets, the list column layout of Arrow
+    lists = [f.toList() if hasattr(f, "toList") else list(f) for f in forms]
+    offsets = np.zeros(len(lists)+1, dtype=np.int64)
+    np.cumsum([len(l) for l in lists], out=offsets[1:])
+    values = np.fromiter((run for l in lists for run in l), dtype=np.int32, count=offsets[-1])
+    return values, offsets
+
+
+def node_chunks(g, sideInfos=None, determineColor=None, chunk_size=CHUNK_SIZE):
+    """
+    The node table of g in sorted chunks of columns. Values too big for uint64 make
+    the n column text. MapFromOne is a (values, offsets) pair.
+    """
+    sideInfos = sideInfos or {}
+
+    if isinstance(g, TrajectoryBatch):
+        for i in range(0, len(g), chunk_size):
+            values = g.values[i:i+chunk_size]
+            chunk = {"n": values}
+            chunk.update({title: g.columns[title][i:i+chunk_size] for title in g.COLUMNS})
+            chunk.update(side_columns(g, values, sideInfos, determineColor))
+            yield chunk
+        return
+
+    nodes = sorted(g)
+    big = len(nodes) and nodes[-1] > UINT64_MAX
+
+    for i in range(0, len(nodes), chunk_size):
+        values = nodes[i:i+chunk_size]
+        chunk = {"n": np.array([str(n) for n in values]) if big else np.array(values, dtype=np.uint64)}
+
+        if isinstance(g, CollatzStoreGraph):
+            # Straight from the store, side infos are computed as columns per chunk
+            store = g.store
+            chunk["StoppingTime"] = np.array([store.stoppingTime(n) for n in values], dtype=np.int32)
+            chunk["MapFromOne"] = _formColumn(store.mapFromOne(n) for n in values)
+            chunk.update(side_columns(g, values, sideInfos, determineColor))
+        else:
+            rows = [g.nodes[n] for n in values]
+            chunk["StoppingTime"] = np.array([row.get("StoppingTime", -1) for row in rows], dtype=np.int32)
+            chunk["MapFromOne"] = _formColumn(row.get("MapFromOne", ()) for row in rows)
+            for title in sideInfos:
+                chunk[title] = [row.get(title) for row in rows]
+            if determineColor:
+                chunk["color"] = [row.get("color") for row in rows]
+
+        yield chunk
+
+
+def _table_path(fileName, extension):
+    os.makedirs('./graph_tables', exist_ok=True)
+    return f'./graph_tables/{fileName}.{extension}'
+
+
+def _arrow_column(pa, column):
+    # Side infos can return anything, what Arrow can't type (or big ints) is kept as text
+    try:
+        return pa.array(column)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.array([None if v is None else str(v) for v in column])
+
+
+def _record_batches(g, sideInfos, determineColor):
+    import pyarrow as pa
+
+    schema = None
+    for chunk in node_chunks(g, sideInfos, determineColor):
+        arrays = {}
+        for name, column in chunk.items():
+            if name == "MapFromOne":
+                values, offsets = column
+                arrays[name] = pa.ListArray.from_arrays(pa.array(offsets.astype(np.int32)), pa.array(values))
+            else:
+                arrays[name] = _arrow_column(pa, column)
+
+        batch = pa.RecordBatch.from_pydict(arrays)
+        # Every batch follows the first one's schema, e.g. a color column that starts with ''
+        schema = schema or batch.schema
+        yield schema, batch.cast(schema)
+
+
+def export_nodes_to_parquet(g,fileName,sideInfos=None, determineColor=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file_path = _table_path(fileName, "parquet")
+    writer = None
+    try:
+        for schema, batch in _record_batches(g, sideInfos, determineColor):
+            writer = writer or pq.ParquetWriter(file_path, schema)
+            writer.write_table(pa.Table.from_batches([batch])) # One row group per chunk
+    finally:
+        if writer:
+            writer.close()
+    return file_path if writer else None
+
+
+def export_nodes_to_arrow(g,fileName,sideInfos=None, determineColor=None):
+    import pyarrow as pa
+
+    file_path = _table_path(fileName, "arrow")
+    writer = None
+    try:
+        for schema, batch in _record_batches(g, sideInfos, determineColor):
+            writer = writer or pa.ipc.new_file(file_path, schema)
+            writer.write_batch(batch)
+    finally:
+        if writer:
+            writer.close()
+    return file_path if writer else None
+
+
+def _numeric(values):
+    if isinstance(values, np.ndarray):
+        return values if values.dtype.kind in "biuf" else None
+    if all(isinstance(v, (bool, int, float, np.number, np.bool_)) for v in values):
+        array = np.asarray(values)
+        return array if array.dtype.kind in "biuf" else None
+    return None
+
+
+class _NpyColumn:
+    # Chunks go to a raw temporary file, the .npy header is written once the length is known
+
+    def __init__(self, directory, name):
+        self.path = os.path.join(directory, name)
+        self.file = open(self.path, "wb")
+        self.dtype = None
+        self.length = 0
+
+    def append(self, array):
+        array = np.asarray(array)
+        self.dtype = self.dtype or array.dtype
+        array = array.astype(self.dtype, copy=False)
+        self.file.write(array.tobytes())
+        self.length += len(array)
+
+    def write_to(self, zf, name):
+        self.file.close()
+        with zf.open(f'{name}.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array_header_1_0(f, {
+                "descr": np.lib.format.dtype_to_descr(self.dtype or np.dtype(np.int64)),
+                "fortran_order": False,
+                "shape": (self.length,),
+            })
+            with open(self.path, "rb") as raw:
+                while block := raw.read(1 << 20):
+                    f.write(block)
+
+
+def export_nodes_to_npz(g,fileName,sideInfos=None, determineColor=None):
+    # Lists and text are stored as <name>_values plus <name>_offsets into them
+    with tempfile.TemporaryDirectory() as tmp:
+        columns = {}
+        bases = {}
+
+        def column(name):
+            if name not in columns:
+                columns[name] = _NpyColumn(tmp, name)
+            return columns[name]
+
+        def appendList(name, values, offsets):
+            base = bases.get(name, 0)
+            if name not in bases:
+                column(f'{name}_offsets').append(offsets[:1])
+            column(f'{name}_values').append(values)
+            column(f'{name}_offsets').append(offsets[1:] + base)
+            bases[name] = base + int(offsets[-1])
+
+        for chunk in node_chunks(g, sideInfos, determineColor):
+            for name, values in chunk.items():
+                if name == "MapFromOne":
+                    appendList(name, *values)
+                    continue
+
+                array = _numeric(values)
+                if name in columns or (f'{name}_values' not in columns and array is not None):
+                    column(name).append(values if array is None else array)
+                else:
+                    encoded = [str(v).encode('utf-8') for v in values]
+                    offsets = np.zeros(len(encoded)+1, dtype=np.int64)
+                    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+                    appendList(name, np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+        file_path = _table_path(fileName, "npz")
+        with zipfile.ZipFile(file_path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name, col in columns.items():
+                col.write_to(zf, name)
+    return file_path
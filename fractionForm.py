@@ -0,0 +1,59 @@
+class FractionForm:
+    """
+    MapFromOne run lengths stored as a parent pointer plus the last run.
+
+    The form of n is built in O(1) from the form of its successor: an odd n
+    starts a new run on top of it, an even n extends its last run and shares
+    its parent. The full list is only materialized when it is read.
+    """
+
+    __slots__ = ("parent", "last", "length")
+
+    def __init__(self, parent=None, last=0):
+        self.parent = parent
+        self.last = last
+        self.length = 1 if parent is None else parent.length+1
+
+    @classmethod
+    def fromSuccessor(cls, n, successor_form):
+        if n %2==1:
+            return cls(successor_form, 0)
+        return cls(successor_form.parent, successor_form.last+1)
+
+    @classmethod
+    def fromParities(cls, p):
+        # p holds a leading 1 and then the parity of every step from 1 outwards
+        form = cls()
+        for i in range(p.bit_length()-2, -1, -1):
+            form = cls(form, 0) if (p >> i) & 1 else cls(form.parent, form.last+1)
+        return form
+
+    def toList(self):
+        l = [0]*self.length
+        form = self
+        for i in range(self.length-1, -1, -1):
+            l[i] = form.last
+            form = form.parent
+        return l
+
+    def __iter__(self):
+        return iter(self.toList())
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if i == -1:
+            return self.last
+        return self.toList()[i]
+
+    def __eq__(self, other):
+        if isinstance(other, FractionForm):
+            other = other.toList()
+        return self.toList() == other
+
+    def __hash__(self):
+        return hash(tuple(self.toList()))
+
+    def __repr__(self):
+        return repr(self.toList())
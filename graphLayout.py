@@ -0,0 +1,90 @@
+import os
+from html import escape
+import numpy as np
+from sideInfos import node_columns, side_columns, valueArray
+
+NODE_SPACING = 12 # Pixels between neighbours on a level
+LEVEL_SPACING = 40
+NODE_RADIUS = 4
+MIN_WIDTH = 400 # Narrow graphs still leave room for their labels
+LABEL_LIMIT = 2000 # Above this many nodes the numbers are left out, they would only overlap
+SVG_CHUNK = 1 << 14 # Edges per <path> and circles per write
+
+
+class LayeredLayout:
+    """
+    Positions for the nodes of g, one level per stopping time, 1 at the top.
+    Levels are read from the stopping times already on the graph, no path
+    searches. Within a level nodes are sorted by their successor's x (then by
+    value) so subtrees stay together and edges barely cross, and spread evenly
+    over the width of the widest level; each level is placed with NumPy at once.
+    """
+
+    def __init__(self, g):
+        values = sorted(g)
+        self.values = valueArray(values)
+        self.levels = node_columns(g, self.values)["StoppingTime"].astype(np.int64)
+
+        # Position of every node's successor in values, 1 points at itself
+        successors = valueArray(next(iter(g.successors(n)), 1) for n in values)
+        self.parents = np.searchsorted(self.values, successors)
+
+        order = np.argsort(self.levels, kind="stable")
+        bounds = np.flatnonzero(np.diff(self.levels[order])) + 1
+        by_level = np.split(order, bounds) if len(order) else []
+
+        width = max((len(level) for level in by_level), default=1)
+        self.width = max(width * NODE_SPACING, MIN_WIDTH)
+        self.height = (int(self.levels.max(initial=0)) + 1) * LEVEL_SPACING
+
+        self.x = np.zeros(len(values))
+        for level in by_level:
+            # Sorted by the successor's x, values already ascending within ties
+            level = level[np.argsort(self.x[self.parents[level]], kind="stable")]
+            self.x[level] = (np.arange(len(level)) + 0.5) * (self.width / len(level))
+        self.y = (self.levels + 0.5) * LEVEL_SPACING
+
+    def __len__(self):
+        return len(self.values)
+
+
+def write_svg(layout, f, colors=None, labels=None):
+    """
+    Streams layout as SVG: all edges as a few <path>s, nodes as circles filled
+    with colors (CSS colors, '' for the default) and labels next to them if given.
+    """
+    x, y, parents = layout.x, layout.y, layout.parents
+
+    f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width:.0f}" height="{layout.height:.0f}" '
+            f'viewBox="0 0 {layout.width:.0f} {layout.height:.0f}">\n')
+    f.write('<style>path{stroke:#999;stroke-width:1;fill:none}circle{fill:lightblue;stroke:#333;stroke-width:.5}'
+            'text{font:8px sans-serif}</style>\n')
+
+    edges = np.flatnonzero(parents != np.arange(len(layout)))
+    for i in range(0, len(edges), SVG_CHUNK):
+        chunk = edges[i:i+SVG_CHUNK]
+        segments = zip(x[chunk].tolist(), y[chunk].tolist(), x[parents[chunk]].tolist(), y[parents[chunk]].tolist())
+        f.write('<path d="' + "".join(f'M{x1:.1f} {y1:.1f}L{x2:.1f} {y2:.1f}' for x1, y1, x2, y2 in segments) + '"/>\n')
+
+    for i in range(0, len(layout), SVG_CHUNK):
+        rows = []
+        for j in range(i, min(i+SVG_CHUNK, len(layout))):
+            fill = f' style="fill:{escape(str(colors[j]))}"' if colors is not None and str(colors[j]) else ""
+            rows.append(f'<circle cx="{x[j]:.1f}" cy="{y[j]:.1f}" r="{NODE_RADIUS}"{fill}/>')
+            if labels is not None:
+                rows.append(f'<text x="{x[j]+NODE_RADIUS+1:.1f}" y="{y[j]+3:.1f}">{escape(str(labels[j]))}</text>')
+        f.write("\n".join(rows) + "\n")
+
+    f.write('</svg>\n')
+
+
+def export_graph_to_svg(g,fileName,sideInfos=None, determineColor=None):
+    layout = LayeredLayout(g)
+    colors = dict(side_columns(g, layout.values, None, determineColor)).get("color")
+    labels = layout.values.tolist() if len(layout) <= LABEL_LIMIT else None
+
+    os.makedirs('./graph_svgs', exist_ok=True)
+    file_path = f'./graph_svgs/{fileName}.svg'
+    with open(file_path, "w", buffering=1 << 16) as f:
+        write_svg(layout, f, colors, labels)
+    return file_path
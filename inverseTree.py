@@ -0,0 +1,51 @@
+import numpy as np
+from fractionForm import FractionForm
+from sideInfos import UINT64_MAX
+
+DOUBLING_SAFE = UINT64_MAX//2 + 1 # Values below it can be doubled without overflowing uint64
+
+
+def predecessors(values):
+    """
+    Children of a frontier in the inverse tree: 2n for every n, and (n-1)/3 when
+    n = 4 mod 6 (so it is an odd integer) and it is not 1, which would close 1->4->2->1.
+    Returns (children, parent positions), grouped by parent, 2n first.
+    """
+    positions = np.arange(len(values))
+    odd = (values %6 == 4) & (values > 4)
+
+    children = np.concatenate([values*2, (values[odd]-1)//3])
+    parents = np.concatenate([positions, positions[odd]])
+    order = np.argsort(parents, kind="stable")
+    return children[order], parents[order]
+
+
+def inverse_tree_levels(depth=None, bound=None):
+    """
+    Yield (values, parents, forms) for every level of the tree grown from 1, level d
+    being the numbers with stopping time d. parents are positions in the previous
+    level's values, forms their MapFromOne built from the parent's in O(1).
+    With a bound, values above it are cut with all their subtrees, so the tree holds
+    the numbers whose trajectory never goes above bound.
+    """
+    if depth is None and bound is None:
+        raise ValueError("inverse tree needs a depth or a value bound")
+
+    # uint64 unless the deepest values might not fit, then Python ints in object arrays
+    largest = bound if bound is not None else 1 << depth
+    dtype = np.uint64 if largest < DOUBLING_SAFE else object
+
+    values = np.array([1], dtype=dtype)
+    forms = [FractionForm()]
+    level = 0
+
+    while len(values) and (depth is None or level < depth):
+        children, parents = predecessors(values)
+        if bound is not None:
+            keep = children <= bound
+            children, parents = children[keep], parents[keep]
+
+        forms = [FractionForm.fromSuccessor(n, forms[p]) for n, p in zip(children.tolist(), parents.tolist())]
+        yield children, parents, forms
+        values = children
+        level += 1
@@ -0,0 +1,88 @@
+import numpy as np
+from fractionForm import FractionForm
+
+JUMP_BITS = 16 # Numbers below 2^JUMP_BITS are walked, the table would run them past 1
+
+
+class JumpTable:
+    """
+    Advances big numbers k steps of T(n) = (3n+1)/2 or n/2 at a time.
+
+    Writing n = 2^k*a + b, after k steps T^k(n) = 3^c*a + d, where c (the odd
+    steps) and d only depend on the low k bits b. Each entry also keeps the
+    parities of the plain 3n+1 / n//2 steps it covers, k + c of them, so
+    stopping times and MapFromOne match the naive walk exactly.
+    """
+
+    def __init__(self, k=JUMP_BITS):
+        self.k = k
+        self.mask = (1 << k) - 1
+
+        d = np.arange(1 << k, dtype=np.int64)
+        odd = np.zeros(1 << k, dtype=np.int64)
+        bits = np.zeros(1 << k, dtype=np.int64) # Plain step parities, first step in the lowest bit
+        length = np.zeros(1 << k, dtype=np.int64)
+
+        for _ in range(k):
+            is_odd = d & 1
+            bits |= is_odd << length
+            length += 1 + is_odd # An odd step is 3n+1 followed by a halving
+            odd += is_odd
+            d = np.where(is_odd == 1, (3*d+1) >> 1, d >> 1)
+
+        self.odd = odd.tolist()
+        self.add = d.tolist()
+        self.bits = bits.tolist()
+        self.length = length.tolist()
+        self.pow3 = [3**c for c in range(k+1)]
+
+    def jump(self, n):
+        b = n & self.mask
+        return self.pow3[self.odd[b]]*(n >> self.k) + self.add[b], b
+
+    def parities(self, n):
+        """
+        Stopping time of n and its parity vector in the FractionForm.fromParities layout: a
+        leading 1 and then one bit per step, the step from n in the lowest bit.
+        """
+        chunks = []
+        steps = 0
+
+        # Below 2^k a jump could run past 1, the rest is walked step by step
+        while n > self.mask:
+            n, b = self.jump(n)
+            chunks.append((self.bits[b], self.length[b]))
+            steps += self.length[b]
+
+        while n != 1:
+            chunks.append((n & 1, 1))
+            steps += 1
+            n = 3*n+1 if n %2==1 else n//2
+
+        p = 1
+        for bits, length in reversed(chunks):
+            p = (p << length) | bits
+        return steps, p
+
+    def stoppingTime(self, n):
+        steps = 0
+        while n > self.mask:
+            n, b = self.jump(n)
+            steps += self.length[b]
+        while n != 1:
+            steps += 1
+            n = 3*n+1 if n %2==1 else n//2
+        return steps
+
+    def mapFromOne(self, n):
+        return FractionForm.fromParities(self.parities(n)[1])
+
+
+_shared = {}
+
+
+def jump_table(k=JUMP_BITS):
+    # One table per process, built the first time a big number needs it
+    if k not in _shared:
+        _shared[k] = JumpTable(k)
+    return _shared[k]
@@ -0,0 +1,89 @@
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class PipelineStats:
+    """
+    Wall and CPU time per stage of r() plus counters, e.g.
+        stats = PipelineStats(live=True)
+        r(user_numbers, prompt, stats=stats)
+        stats.dump("stats.json")
+    Stages with the same name add up. live=True prints numbers/sec to stderr
+    while metered loops run.
+    """
+
+    enabled = True
+
+    def __init__(self, live=False, interval=1.0):
+        self.live = live
+        self.interval = interval
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+            totals["wall_seconds"] += time.perf_counter() - wall
+            totals["cpu_seconds"] += time.process_time() - cpu
+            totals["calls"] += 1
+
+    def count(self, name, k=1):
+        self.counters[name] = self.counters.get(name, 0) + k
+
+    def peak(self, name, value):
+        # Keeps the highest value seen for name
+        if value > self.counters.get(name, value - 1):
+            self.counters[name] = value
+
+    def meter(self, itr, name="numbers"):
+        # itr unchanged unless live, then a generator reporting its throughput
+        return self._metered(itr, name) if self.live else itr
+
+    def _metered(self, itr, name):
+        start = last = time.perf_counter()
+        done = 0
+        for done, n in enumerate(itr, 1):
+            yield n
+            now = time.perf_counter()
+            if now - last >= self.interval:
+                print(f'\r{name}: {done} at {done/(now-start):,.0f}/s', end="", file=sys.stderr, flush=True)
+                last = now
+        if last != start:
+            print(f'\r{name}: {done} at {done/max(time.perf_counter()-start, 1e-9):,.0f}/s', file=sys.stderr)
+
+    def to_dict(self):
+        return {"stages": self.stages, "counters": self.counters}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+_NO_STAGE = nullcontext()
+
+
+class _NoStats(PipelineStats):
+    # Default of r() and friends: every call is a no-op so disabled stats cost a method call
+
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+
+    def stage(self, name):
+        return _NO_STAGE
+
+    def count(self, name, k=1):
+        pass
+
+    def peak(self, name, value):
+        pass
+
+
+NO_STATS = _NoStats()
@@ -0,0 +1,166 @@
+import itertools
+import math
+import re
+from bisect import bisect_right
+from collections.abc import Sequence
+from decimal import Decimal, InvalidOperation
+
+NUMBER = r"\d+\^\d+|\d+(?:\.\d+)?(?:[eE]\d+)?"
+PART = re.compile(rf"""\s*(?P<lo>{NUMBER})?\s*(?P<dash>-\s*(?P<hi>{NUMBER}))?
+                       \s*(?::\s*(?P<step>{NUMBER}))?
+                       \s*(?:mod\s*(?P<mod>{NUMBER})\s*=\s*(?P<residue>{NUMBER}))?\s*""", re.VERBOSE | re.IGNORECASE)
+DEFAULT_RANGE_START = 3 # "-40" starts at 3, as the prompt always did
+MAX_NUMBER_DIGITS = 1000 # Bigger numbers would take ages to expand, let alone to walk
+
+
+def parse_number(s):
+    # 100, 1e9, 2.5e3 or 2^40; anything that isn't a whole number is a syntax error
+    if "^" in s:
+        base, exponent = (int(part) if len(part) <= MAX_NUMBER_DIGITS else None for part in s.split("^"))
+        if base is None or exponent is None or (base > 1 and exponent*math.log10(base) >= MAX_NUMBER_DIGITS):
+            raise SyntaxError(f"{s} has more than {MAX_NUMBER_DIGITS} digits")
+        return base ** exponent
+    try:
+        value = Decimal(s)
+    except InvalidOperation:
+        raise SyntaxError(f"{s} is not a number")
+    if value and value.adjusted() >= MAX_NUMBER_DIGITS:
+        raise SyntaxError(f"{s} has more than {MAX_NUMBER_DIGITS} digits")
+    if value != value.to_integral_value():
+        raise SyntaxError(f"{s} is not a whole number")
+    return int(value)
+
+
+def residue_filter(r, mod, residue):
+    # The values of range r that are residue mod `mod`, again a range: r.step*i = residue - start (mod)
+    g = math.gcd(r.step, mod)
+    if (residue - r.start) %g:
+        return range(r.start, r.start)
+    period = mod // g
+    i = (residue - r.start) // g * pow(r.step // g, -1, period) %period if period > 1 else 0
+    return range(r.start + i*r.step, r.stop, r.step*period)
+
+
+def parse_part(text):
+    match = PART.fullmatch(text)
+    if not match or not (match["lo"] or match["dash"]):
+        raise SyntaxError(f"can't read {text!r}")
+
+    if match["dash"]:
+        lo = parse_number(match["lo"]) if match["lo"] else DEFAULT_RANGE_START
+        hi = parse_number(match["hi"])
+    else:
+        lo = hi = parse_number(match["lo"])
+    if lo < 1:
+        raise SyntaxError(f"{lo} has no Collatz trajectory, numbers start at 1")
+    step = parse_number(match["step"]) if match["step"] else 1
+    if step < 1:
+        raise SyntaxError("the step must be at least 1")
+
+    r = range(lo, hi+1, step)
+    if match["mod"]:
+        mod, residue = parse_number(match["mod"]), parse_number(match["residue"])
+        if not 0 <= residue < mod:
+            raise SyntaxError(f"residue {residue} out of range for mod {mod}")
+        r = residue_filter(r, mod, residue)
+    return r
+
+
+def subtract(r, intervals):
+    # Pieces of the interval r (step 1) not covered by the earlier intervals
+    pieces = [r]
+    for other in intervals:
+        pieces = [piece for p in pieces
+                  for piece in (range(p.start, min(p.stop, other.start)), range(max(p.start, other.stop), p.stop))
+                  if len(piece)]
+    return pieces
+
+
+def parse_spec(s):
+    """
+    The ranges of a spec: parts separated by commas, each a number or a-b range
+    with an optional :step and "mod m = r" filter, e.g. "1-100,200-300",
+    "1-1e9:2" or "1-1e8 mod 4 = 3"; numbers can be written 1e9 or 2^40
+    and have at most MAX_NUMBER_DIGITS digits.
+    Plain ranges that overlap earlier ones are clipped, so unions of ranges
+    visit every number once; stepped or filtered parts are kept whole.
+    """
+    parts = []
+    intervals = []
+    for text in s.split(","):
+        r = parse_part(text)
+        if r.step == 1:
+            pieces = subtract(r, intervals)
+            intervals.append(r)
+            parts += pieces
+        elif len(r):
+            parts.append(r)
+    return parts
+
+
+PLAIN_NUMBERS = re.compile(r"\s*\d+\s*(,\s*\d+\s*)*")
+
+
+def spec_numbers(s):
+    # A list for plain numbers, a range for a single range and a lazy RangeSpec for unions
+    if PLAIN_NUMBERS.fullmatch(s):
+        numbers = [parse_number(n) for n in s.split(",")]
+        if min(numbers) < 1:
+            raise SyntaxError(f"{min(numbers)} has no Collatz trajectory, numbers start at 1")
+        return numbers
+    parts = parse_spec(s)
+    return parts[0] if len(parts) == 1 else RangeSpec(parts)
+
+
+class RangeSpec(Sequence):
+    """
+    The numbers of several ranges one after another, without materializing them.
+    Has a length, indexes and slices like a list (slices are RangeSpecs again,
+    so shards like spec[i::workers] stay lazy) and can be read in chunks.
+    """
+
+    def __init__(self, parts):
+        self.parts = [p for p in parts if len(p)]
+        self._offsets = [0]
+        for p in self.parts:
+            self._offsets.append(self._offsets[-1] + len(p))
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.parts)
+
+    def __contains__(self, n):
+        return any(n in p for p in self.parts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._slice(*i.indices(len(self)))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("RangeSpec index out of range")
+        k = bisect_right(self._offsets, i) - 1
+        return self.parts[k][i - self._offsets[k]]
+
+    def _slice(self, start, stop, step):
+        if step < 0:
+            return list(self)[start:stop:step]
+        parts = []
+        for p, offset in zip(self.parts, self._offsets):
+            first = max(start, offset)
+            first += -(first - start) %step # Next position the slice visits
+            last = min(stop, offset + len(p))
+            if first < last:
+                parts.append(p[first-offset:last-offset:step])
+        return RangeSpec(parts)
+
+    def chunks(self, size):
+        # Consecutive ranges of at most size numbers
+        for p in self.parts:
+            for i in range(0, len(p), size):
+                yield p[i:i+size]
+
+    def __repr__(self):
+        return f'RangeSpec({self.parts!r})'
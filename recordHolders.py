@@ -0,0 +1,135 @@
+import heapq
+import numpy as np
+from collatzBatch import TrajectoryBatch, batch_trajectories
+from sideInfos import UINT64_MAX
+
+CHUNK_SIZE = 1 << 16 # Start values per batch, the only memory that grows with the chunk and not with k
+METRICS = {
+    "StoppingTime": lambda columns: columns["StoppingTime"],
+    "Peak": lambda columns: columns["Peak"],
+    "MapFromOne": lambda columns: columns["OddSteps"] + 1, # Run lengths in MapFromOne, one per 3n+1 step plus the first
+}
+
+
+class LeaderBatch(TrajectoryBatch):
+    """
+    The leaders of a streamed run as a TrajectoryBatch, so export_nodes_to_csv
+    writes them. MapFromOne is the length of MapFromOne and Leads says what
+    each start leads, e.g. "StoppingTime #1; Peak record".
+    """
+
+    COLUMNS = TrajectoryBatch.COLUMNS + ["MapFromOne", "Leads"]
+
+
+def trajectory_columns(values):
+    # The TrajectoryBatch columns for a few scattered values, walked one by one
+    rows = []
+    for n in values:
+        start, steps, glide, peak, odd = n, 0, -1 if n > 1 else 0, n, 0
+        while n != 1:
+            if n %2==1:
+                n, odd = 3*n+1, odd+1
+            else:
+                n //= 2
+            steps += 1
+            peak = max(peak, n)
+            if glide < 0 and n < start:
+                glide = steps
+        rows.append((steps, glide, peak, odd))
+    columns = list(zip(*rows)) or [(), (), (), ()]
+    return {title: np.array(column, dtype=object if title == "Peak" else np.int64)
+            for title, column in zip(TrajectoryBatch.COLUMNS, columns)}
+
+
+def chunks_of(itr, chunk_size):
+    # (values, columns) per chunk; ranges of uint64 starts go through the vectorized batch engine
+    if isinstance(itr, range):
+        parts = (itr[i:i+chunk_size] for i in range(0, len(itr), chunk_size))
+    elif hasattr(itr, "chunks"): # RangeSpec
+        parts = itr.chunks(chunk_size)
+    else:
+        values = list(itr)
+        for i in range(0, len(values), chunk_size):
+            chunk = values[i:i+chunk_size]
+            yield np.array(chunk, dtype=object), trajectory_columns(chunk)
+        return
+
+    for part in parts:
+        if part and max(part[0], part[-1]) > UINT64_MAX:
+            chunk = list(part)
+            yield np.array(chunk, dtype=object), trajectory_columns(chunk)
+            continue
+        batch = batch_trajectories(part)
+        yield batch.values, batch.columns
+
+
+class Leaderboard:
+    """
+    The k start values with the highest value of each metric, kept in bounded
+    heaps, plus the record holders: starts whose value beats every start before
+    them in input order (for 1-N, the classic delay and peak records).
+    Memory is O(k + records), whatever the size of the input.
+    """
+
+    def __init__(self, k=10, metrics=tuple(METRICS)):
+        self.k = k
+        self.metrics = list(metrics)
+        self.heaps = {m: [] for m in self.metrics} # (value, -n, row), smallest on top
+        self.records = {m: [] for m in self.metrics} # (n, row) in the order they were set
+        self.best = {m: -1 for m in self.metrics}
+
+    def add(self, values, columns):
+        def row(i):
+            return tuple(int(columns[title][i]) for title in TrajectoryBatch.COLUMNS)
+
+        for m in self.metrics:
+            column = METRICS[m](columns)
+            if not len(column):
+                continue
+
+            # Only the chunk's own top k, and whatever ties with its k-th, can enter the heap
+            if column.dtype == object or len(column) <= self.k:
+                candidates = range(len(column))
+            else:
+                candidates = np.flatnonzero(column >= np.partition(column, -self.k)[-self.k]).tolist()
+            heap = self.heaps[m]
+            for i in candidates:
+                entry = (int(column[i]), -int(values[i]), row(i))
+                if len(heap) < self.k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+
+            running = np.maximum.accumulate(column)
+            records = ([0] if column[0] > self.best[m] else []) + (np.flatnonzero(column[1:] > running[:-1]) + 1).tolist()
+            for i in records:
+                if column[i] > self.best[m]:
+                    self.records[m].append((int(values[i]), row(i)))
+            self.best[m] = max(self.best[m], int(running[-1]))
+
+    def to_batch(self):
+        leads = {}
+        stats = {}
+        for m in self.metrics:
+            for rank, (_, n, row) in enumerate(sorted(self.heaps[m], reverse=True), 1):
+                leads.setdefault(-n, []).append(f'{m} #{rank}')
+                stats[-n] = row
+            for n, row in self.records[m]:
+                leads.setdefault(n, []).append(f'{m} record')
+                stats[n] = row
+
+        values = sorted(stats)
+        rows = [stats[n] for n in values]
+        columns = {title: np.array([r[j] for r in rows], dtype=object if title == "Peak" else np.int64)
+                   for j, title in enumerate(TrajectoryBatch.COLUMNS)}
+        columns["MapFromOne"] = columns["OddSteps"] + 1
+        columns["Leads"] = np.array(["; ".join(leads[n]) for n in values], dtype=object)
+        big = values and values[-1] > UINT64_MAX # Sorted, so the last one is the largest
+        return LeaderBatch(np.array(values, dtype=object if big else np.uint64), columns)
+
+
+def stream_leaders(itr, k=10, metrics=tuple(METRICS), chunk_size=CHUNK_SIZE):
+    board = Leaderboard(k, metrics)
+    for values, columns in chunks_of(itr, chunk_size):
+        board.add(values, columns)
+    return board.to_batch()
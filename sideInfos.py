@@ -0,0 +1,75 @@
+import numpy as np
+
+UINT64_MAX = (1 << 64) - 1
+
+
+class ColumnInfo:
+    """
+    A side info (or determineColor) that computes a whole column at once.
+
+    f(values, columns) gets a NumPy array of node values and a dict of the columns
+    already known for them (StoppingTime, plus GlideTime, Peak and OddSteps for
+    batches) and returns one entry per value, e.g.
+        {"Mod6": ColumnInfo(lambda values, columns: values % 6)}
+    """
+
+    def __init__(self, f):
+        self.f = f
+
+    def column(self, values, columns, g):
+        return self.f(values, columns)
+
+    def __call__(self, n, g):
+        # Per node use, e.g. by addNumberToCollatzGraph
+        values = valueArray([n])
+        return self.column(values, node_columns(g, values), g)[0]
+
+
+class PerNodeInfo(ColumnInfo):
+    # Adapter for the per node contract f(n, g) of the existing lambdas
+
+    def column(self, values, columns, g):
+        return [self.f(int(n), g) for n in values]
+
+    def __call__(self, n, g):
+        return self.f(n, g)
+
+
+def asColumnInfo(f):
+    return f if isinstance(f, ColumnInfo) else PerNodeInfo(f)
+
+
+def valueArray(values):
+    values = list(values)
+    if values and max(values) > UINT64_MAX:
+        return np.array(values, dtype=object)
+    return np.array(values, dtype=np.uint64)
+
+
+def node_columns(g, values):
+    if hasattr(g, "nodeColumns"): # CollatzStoreGraph and TrajectoryBatch
+        return g.nodeColumns(values)
+    return {"StoppingTime": np.array([g.nodes[int(n)].get("StoppingTime", -1) for n in values])}
+
+
+def side_columns(g, values, sideInfos=None, determineColor=None):
+    """
+    Yield (title, column) for every side info and then "color", computed once for
+    all of values. Titles come one at a time so callers can attach a column before
+    the next side info, which may read it, runs.
+    """
+    values = valueArray(values)
+    columns = node_columns(g, values)
+
+    for title, f in (sideInfos or {}).items():
+        yield title, asColumnInfo(f).column(values, columns, g)
+    if determineColor:
+        yield "color", asColumnInfo(determineColor).column(values, columns, g)
+
+
+def attach_side_infos(G, sideInfos=None, determineColor=None):
+    # Stores the columns as node attributes of an nx.DiGraph, once, after generation
+    values = list(G)
+    for title, column in side_columns(G, values, sideInfos, determineColor):
+        for n, v in zip(values, column):
+            G.nodes[n][title] = v.item() if isinstance(v, np.generic) else v
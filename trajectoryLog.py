@@ -0,0 +1,221 @@
+import math
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+SIEVE_LIMIT = 1 << 24 # Largest sieve built, about 64MB; values above it are factored with Pollard-rho
+LOG_HEADER = "index, number, factorization, distance from power of 2, reminder mod 4, is peak\n"
+MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37) # Deterministic below 3.3e24
+
+
+def spf_sieve(limit):
+    # Smallest prime factor of every number up to limit, 0 for 0 and 1
+    spf = np.zeros(limit+1, dtype=np.uint32)
+    spf[2::2] = 2
+    for p in range(3, math.isqrt(limit)+1, 2):
+        if spf[p] == 0:
+            multiples = spf[p*p::2*p]
+            multiples[multiples == 0] = p
+
+    primes = np.flatnonzero(spf == 0)[2:]
+    spf[primes] = primes
+    return spf
+
+
+def is_probable_prime(n):
+    if n < 2:
+        return False
+    for p in MILLER_RABIN_BASES:
+        if n %p==0:
+            return n == p
+
+    d, s = n-1, 0
+    while d %2==0:
+        d, s = d//2, s+1
+
+    for a in MILLER_RABIN_BASES:
+        x = pow(a, d, n)
+        if x in (1, n-1):
+            continue
+        for _ in range(s-1):
+            x = x*x %n
+            if x == n-1:
+                break
+        else:
+            return False
+    return True
+
+
+def pollard_rho(n):
+    # Brent's variant, returns a non trivial factor of the composite n
+    if n %2==0:
+        return 2
+    while True:
+        y, c, m = random.randrange(1, n), random.randrange(1, n), 128
+        g, r, q = 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y*y + c) %n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r-k)):
+                    y = (y*y + c) %n
+                    q = q*abs(x-y) %n
+                g = math.gcd(q, n)
+                k += m
+            r *= 2
+
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = (ys*ys + c) %n
+                g = math.gcd(abs(x-ys), n)
+        if g != n:
+            return g
+
+
+class Factorizer:
+    """
+    Factors the numbers of trajectories: a smallest prime factor sieve up to
+    `limit` (capped at SIEVE_LIMIT) and Pollard-rho only for what lies above it.
+    """
+
+    def __init__(self, limit):
+        self.limit = max(2, min(limit, SIEVE_LIMIT))
+        self.spf = spf_sieve(self.limit)
+
+    def factorize(self, n):
+        factors = {}
+
+        twos = (n & -n).bit_length()-1 if n else 0
+        if twos:
+            factors[2] = twos
+            n >>= twos
+
+        stack = [n] if n > 1 else []
+        while stack:
+            m = stack.pop()
+            if m <= self.limit:
+                while m > 1:
+                    p = int(self.spf[m])
+                    factors[p] = factors.get(p, 0)+1
+                    m //= p
+            elif is_probable_prime(m):
+                factors[m] = factors.get(m, 0)+1
+            else:
+                d = pollard_rho(m)
+                stack += [d, m//d]
+
+        return dict(sorted(factors.items()))
+
+
+def format_factorization(factors):
+    return " * ".join(f'{p}^{e}' for p, e in factors.items())
+
+
+def log_row(index, n, factors):
+    odd_factors = sum(e for p, e in factors.items() if p != 2) # How many odd primes separate n from a power of 2
+    return f'{index}, {n}, {format_factorization(factors)}, {odd_factors}, {n %4}, {" peak" if n %4==0 else ""}\n'
+
+
+def trajectory(n):
+    path = [n]
+    while n != 1:
+        n = 3*n+1 if n %2==1 else n//2
+        path.append(n)
+    return path
+
+
+def write_trajectory_log(n, factorizer=None, directory='./collatz_calcs'):
+    path = trajectory(n)
+    factorizer = factorizer or Factorizer(max(path))
+
+    os.makedirs(directory, exist_ok=True)
+    with open(f'{directory}/collatz_log_for_{n}.csv', "w") as f:
+        f.write(LOG_HEADER)
+        f.writelines(log_row(i, m, factorizer.factorize(m)) for i, m in enumerate(path))
+
+
+class _WriterPool:
+    # Writes files from a few threads, with at most max_pending documents held in memory
+
+    def __init__(self, writers, max_pending):
+        self.pool = ThreadPoolExecutor(max_workers=writers)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+
+    def _write(self, path, text):
+        try:
+            with open(path, "w", buffering=1 << 16) as f:
+                f.write(text)
+        finally:
+            self.slots.release()
+
+    def submit(self, path, text):
+        self.slots.acquire()
+        pending = []
+        for f in self.futures:
+            if f.done():
+                f.result() # Raise write errors as soon as they are seen, not only at close
+            else:
+                pending.append(f)
+        self.futures = pending
+        self.futures.append(self.pool.submit(self._write, path, text))
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        for f in self.futures:
+            f.result() # Raise write errors
+
+
+def generate_trajectory_logs(starts, directory='./collatz_calcs', consolidated=False, name="batch", writers=4):
+    """
+    Logs for many start values in one pass. Trajectories are only walked until
+    they join one already seen, and every value's row (all but the index) is
+    rendered once and shared by all the logs that pass through it.
+    With consolidated=True a single long format file replaces the per start files.
+    """
+    starts = list(starts)
+
+    # Successors of every value, shared tails are walked once; one sieve for the highest value
+    successor = {1: None}
+    peak = 2
+    for n in starts:
+        while n not in successor:
+            successor[n] = 3*n+1 if n %2==1 else n//2
+            peak = max(peak, n)
+            n = successor[n]
+
+    factorizer = Factorizer(peak)
+    rows = {}
+
+    def row(m):
+        if m not in rows:
+            rows[m] = log_row("", m, factorizer.factorize(m)) # ", number, ..." without the index
+        return rows[m]
+
+    def rows_for(n):
+        i = 0
+        while n is not None:
+            yield f'{i}{row(n)}'
+            n, i = successor[n], i+1
+
+    os.makedirs(directory, exist_ok=True)
+
+    if consolidated:
+        with open(f'{directory}/collatz_logs_for_{name}.csv', "w", buffering=1 << 16) as f:
+            f.write("start, " + LOG_HEADER)
+            for n in starts:
+                f.writelines(f'{n}, {r}' for r in rows_for(n))
+        return
+
+    pool = _WriterPool(writers, max_pending=4*writers)
+    try:
+        for n in starts:
+            pool.submit(f'{directory}/collatz_log_for_{n}.csv', LOG_HEADER + "".join(rows_for(n)))
+    finally:
+        pool.close()
@@ -0,0 +1,55 @@
+import os
+import re
+
+NEWICK_RESERVED = re.compile(r"[\s()\[\]:;,=&]")
+
+
+def children_of(g):
+    # nx.DiGraph knows its predecessors, other graphs get a child index built in one pass
+    if hasattr(g, "predecessors"):
+        return g.predecessors
+    children = {}
+    for n in g:
+        for successor in g.successors(n):
+            children.setdefault(successor, []).append(n)
+    return lambda n: children.get(n, ())
+
+
+def newick_annotation(data, titles):
+    # NHX comment, the format ete3 writes features in, e.g. [&&NHX:Mod6=4:color=green]
+    fields = [f'{title}={NEWICK_RESERVED.sub("_", str(data[title]))}' for title in titles if str(data.get(title, ""))]
+    return f'[&&NHX:{":".join(fields)}]' if fields else ""
+
+
+def write_newick(g, f, titles=(), root=1):
+    """
+    Streams the tree of g rooted at 1 to f as Newick, children being the
+    predecessors. An explicit stack replaces the recursion, so depth is only
+    bound by memory; titles are node attributes written as NHX annotations.
+    """
+    children = children_of(g)
+    label = (lambda n: f'{n}{newick_annotation(g.nodes[n], titles)}') if titles else str
+
+    stack = [(root, iter(children(root)), True)]
+    while stack:
+        n, pending, first = stack[-1]
+        child = next(pending, None)
+        if child is None:
+            stack.pop()
+            f.write(f'{"" if first else ")"}{label(n)}')
+            continue
+
+        f.write("(" if first else ",")
+        stack[-1] = (n, pending, False)
+        stack.append((child, iter(children(child)), True))
+    f.write(";\n")
+
+
+def export_tree_to_newick(g,fileName,sideInfos=None, determineColor=None):
+    titles = [*(sideInfos or {}).keys(), *(["color"] if determineColor else [])]
+
+    os.makedirs('./collatz_graph', exist_ok=True)
+    file_path = f'./collatz_graph/{fileName}.nw'
+    with open(file_path, "w", buffering=1 << 16) as f:
+        write_newick(g, f, titles)
+    return file_path